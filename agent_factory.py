@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import List
+from phi.tools.duckduckgo import DuckDuckGo
+from model_backends import MODEL_BACKEND, get_backend
+from resilience import SEARCH_POLICY, call_with_policy
+from search_layer import cached_search, json_fetch, search_many
+
+# Model for the configured backend; override with MODEL_ID
+MODEL_ID = os.environ.get("MODEL_ID") or get_backend(MODEL_BACKEND).default_model
+
+class GuardedDuckDuckGo(DuckDuckGo):
+    """DuckDuckGo tool with cached, parallel searches.
+
+    Live searches get a timeout, retries and a circuit breaker; results are
+    shared process-wide per normalized query (see search_layer).
+    """
+
+    def __init__(self, policy=SEARCH_POLICY, **kwargs):
+        self.policy = policy
+        kwargs.setdefault("timeout", int(policy.timeout))
+        super().__init__(**kwargs)
+        if kwargs.get("search", True):
+            self.register(self.duckduckgo_search_many)
+
+    def _fetch(self, search):
+        """Guarded live search returning a list of results."""
+        return json_fetch(
+            lambda query, max_results: call_with_policy(
+                lambda: search(query, max_results), self.policy, "duckduckgo"
+            )
+        )
+
+    def duckduckgo_search(self, query: str, max_results: int = 5) -> str:
+        """Use this function to search DuckDuckGo for a query.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The result from DuckDuckGo.
+        """
+        fetch = self._fetch(super().duckduckgo_search)
+        source = f"{type(self).__name__}.search"
+        return json.dumps(cached_search(source, query, max_results, fetch), indent=2)
+
+    def duckduckgo_news(self, query: str, max_results: int = 5) -> str:
+        """Use this function to get the latest news from DuckDuckGo.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The latest news from DuckDuckGo.
+        """
+        fetch = self._fetch(super().duckduckgo_news)
+        source = f"{type(self).__name__}.news"
+        return json.dumps(cached_search(source, query, max_results, fetch), indent=2)
+
+    def duckduckgo_search_many(self, queries: List[str], max_results: int = 5) -> str:
+        """Use this function to run several DuckDuckGo searches at once, in parallel.
+        Prefer it to repeated single searches when you need more than one query.
+
+        Args:
+            queries (List[str]): The queries to search for.
+            max_results (optional, default=5): The maximum number of results per query.
+
+        Returns:
+            The combined results without duplicates, each labelled with the query that found it.
+        """
+        fetch = self._fetch(super().duckduckgo_search)
+        source = f"{type(self).__name__}.search"
+        results, errors = search_many(source, queries, max_results, fetch)
+        return json.dumps({"results": results, "failed_queries": errors} if errors else results, indent=2)
+
+def fake_duckduckgo():
+    """Local search stand-in with configurable latency and failures (see fake_services)."""
+    from fake_services import FakeDuckDuckGo
+
+    return FakeDuckDuckGo()
+
+# Tools the agent can be built with, by name
+TOOL_FACTORIES = {
+    "duckduckgo": GuardedDuckDuckGo,
+    "fake_duckduckgo": fake_duckduckgo,
+}
+# Comma-separated AGENT_TOOLS, e.g. empty for fully offline runs
+DEFAULT_TOOLS = tuple(name for name in os.environ.get("AGENT_TOOLS", "duckduckgo").split(",") if name)
+
+def key_hash(api_key):
+    """Hash of an API key, so raw keys are never used as cache keys."""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+def model_label(backend=MODEL_BACKEND, model_id=MODEL_ID):
+    """Backend and model, as recorded in cache keys and results."""
+    return f"{backend}/{model_id}"
+
+def build_agent(api_key, model_id=MODEL_ID, tools=DEFAULT_TOOLS, backend=MODEL_BACKEND):
+    """Construct a fresh medical agent (model client plus tools)."""
+    return get_backend(backend).build(api_key, model_id, [TOOL_FACTORIES[name]() for name in tools])
+
+class AgentPool:
+    """Reusable agents for one (API key, model, tools) configuration.
+
+    phidata agents keep per-run state, so an agent is leased to one caller
+    at a time; idle agents (and their HTTP clients) are reused by later
+    reruns and by other sessions.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+        # Build one agent up front so configuration errors surface immediately
+        self._idle.append(self._create())
+
+    def _create(self):
+        agent = self._factory()
+        self.created += 1
+        return agent
+
+    @contextmanager
+    def lease(self):
+        """Borrow an agent for the duration of one run."""
+        with self._lock:
+            agent = self._idle.pop() if self._idle else None
+        if agent is None:
+            agent = self._create()
+        try:
+            yield agent
+        finally:
+            # Don't carry one session's conversation into the next lease
+            agent.memory.clear()
+            with self._lock:
+                self._idle.append(agent)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def agent_pool(api_key, model_id=MODEL_ID, tools=DEFAULT_TOOLS, backend=MODEL_BACKEND):
+    """Process-wide agent pool for a configuration, created on first use."""
+    key = (key_hash(api_key), model_id, tuple(tools), backend)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = AgentPool(lambda: build_agent(api_key, model_id, tools, backend))
+            _pools[key] = pool
+        return pool
+
+def evict_agents(api_key):
+    """Drop every pool built with this API key (e.g. when it is reset)."""
+    hashed = key_hash(api_key)
+    with _pools_lock:
+        for key in [key for key in _pools if key[0] == hashed]:
+            del _pools[key]
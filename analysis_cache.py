@@ -0,0 +1,113 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Persistent store for finished reports; override with ANALYSIS_CACHE_PATH
+ANALYSIS_CACHE_PATH = os.environ.get(
+    "ANALYSIS_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "medical-imaging-agent", "analyses.sqlite3"),
+)
+ANALYSIS_TTL_SECONDS = 7 * 24 * 3600
+ANALYSIS_CACHE_MAX_BYTES = 64 << 20
+
+def analysis_key(image_paths, prompt, model_id, tools):
+    """Content-addressed key: image bytes, prompt, model and tool configuration."""
+    digest = hashlib.sha256()
+    for image_path in image_paths:
+        with open(image_path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    digest.update(hashlib.sha256(prompt.encode()).digest())
+    digest.update(model_id.encode())
+    digest.update(",".join(tools).encode())
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """SQLite-backed report cache with TTL and size-based LRU eviction."""
+
+    def __init__(self, path=ANALYSIS_CACHE_PATH, ttl=ANALYSIS_TTL_SECONDS,
+                 max_bytes=ANALYSIS_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                " key TEXT PRIMARY KEY,"
+                " report TEXT NOT NULL,"
+                " latency REAL NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection per call (safe across threads), committed on exit."""
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key):
+        """Return (report, original latency in seconds) or None."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute("DELETE FROM analyses WHERE created < ?", (now - self.ttl,))
+            row = db.execute(
+                "SELECT report, latency FROM analyses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                db.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (now, key))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.saved_seconds += row[1]
+        return row
+
+    def put(self, key, report, latency):
+        """Store a report, then evict least recently used rows over the size budget."""
+        now = time.time()
+        size = len(report.encode())
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, report, latency, size, now, now),
+            )
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+            for old_key, old_size in db.execute(
+                "SELECT key, size FROM analyses ORDER BY last_used"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM analyses WHERE key = ?", (old_key,))
+                total -= old_size
+
+    def stats(self):
+        """Hit rate, API time saved and store size, for display."""
+        with self._connect() as db:
+            entries, size = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analyses"
+            ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "entries": entries,
+                "bytes": size,
+            }
@@ -0,0 +1,63 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from analysis_stream import run_text
+from dispatcher import estimate_tokens
+from prompts import RESEARCH_QUERY
+from resilience import ANALYSIS_POLICY, call_with_policy, check_abandoned
+
+# Research phases running in the background, across all sessions
+RESEARCH_WORKERS = 4
+# Sections 1-3 (type, findings, assessment) are what research is based on
+FINDINGS_SECTIONS = 3
+
+_research_executor = ThreadPoolExecutor(max_workers=RESEARCH_WORKERS, thread_name_prefix="research")
+
+def findings_text(report, complete=False):
+    """Sections 1-3 of a vision report once section 4 has begun, else None.
+
+    With ``complete`` the whole report is used when it never reaches a
+    fourth section.
+    """
+    headers = [match.start() for match in re.finditer(r"^### ", report, re.MULTILINE)]
+    if len(headers) > FINDINGS_SECTIONS:
+        return report[:headers[FINDINGS_SECTIONS]].strip()
+    return report.strip() if complete else None
+
+def research_prompt(findings):
+    return RESEARCH_QUERY + findings + "\n"
+
+def run_research(agents, dispatcher, findings, policy=ANALYSIS_POLICY):
+    """Blocking research phase (text only, with search tools); returns (section, timing)."""
+    prompt = research_prompt(findings)
+    tokens = estimate_tokens(prompt, image_count=0)
+
+    def attempt():
+        timing = {}
+        with dispatcher.slot(tokens), agents.lease() as agent:
+            check_abandoned()
+            return run_text(agent, prompt, [], timing), timing
+
+    return call_with_policy(attempt, policy, "model")
+
+def start_research(agents, dispatcher, findings):
+    """Run the research phase in the background; returns a Future of (section, timing)."""
+    return _research_executor.submit(run_research, agents, dispatcher, findings)
+
+def research_when_ready(deltas, start):
+    """Pass a vision stream through, calling ``start(findings)`` as soon as sections 1-3 are done.
+
+    Research then overlaps the rest of the vision output. If the stream
+    ends first, ``start`` gets the whole report.
+    """
+    report = ""
+    started = False
+    for delta in deltas:
+        report += delta
+        if not started:
+            findings = findings_text(report)
+            if findings is not None:
+                start(findings)
+                started = True
+        yield delta
+    if not started:
+        start(findings_text(report, complete=True))
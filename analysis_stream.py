@@ -0,0 +1,37 @@
+import time
+
+# Report sections start with a level-3 markdown header
+SECTION_MARKER = "\n### "
+
+def stream_text(agent, query, images, timing):
+    """Yield the text deltas of a streamed agent run.
+
+    ``timing`` is filled in place with ``first_token`` (seconds until the
+    first non-empty delta) and ``total`` (seconds until the stream ends).
+    """
+    start = time.perf_counter()
+    for chunk in agent.run(query, images=images, stream=True):
+        content = getattr(chunk, "content", chunk)
+        # Tool-call events carry no text
+        if not isinstance(content, str) or not content:
+            continue
+        if "first_token" not in timing:
+            timing["first_token"] = time.perf_counter() - start
+        yield content
+    timing["total"] = time.perf_counter() - start
+    timing.setdefault("first_token", timing["total"])
+
+def run_text(agent, query, images, timing):
+    """Blocking run; first token and total latency are the same."""
+    start = time.perf_counter()
+    response = agent.run(query, images=images)
+    timing["first_token"] = timing["total"] = time.perf_counter() - start
+    return response.content
+
+def completed_sections_end(report, start=0):
+    """End offset of the last complete section after ``start``, or ``start``.
+
+    A section is complete once the next section header has started.
+    """
+    boundary = report.rfind(SECTION_MARKER, start)
+    return boundary + 1 if boundary >= start else start
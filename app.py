@@ -1,16 +1,65 @@
-import os
-from PIL import Image
-import pydicom
-import numpy as np
-from phi.agent import Agent
-from phi.model.google import Gemini
+import time
+from contextlib import ExitStack
 import streamlit as st
-from phi.tools.duckduckgo import DuckDuckGo
+from agent_factory import DEFAULT_TOOLS, MODEL_ID, agent_pool, evict_agents, model_label
+from analysis_cache import AnalysisCache, analysis_key
+from analysis_phases import findings_text, research_prompt, research_when_ready, start_research
+from analysis_stream import completed_sections_end, run_text, stream_text
+from dicom_frames import key_frames, uniform_sample
+from dicom_header import describe_header, header_prompt_context, summarize_dataset
+from dicom_pixels import WINDOW_OPTIONS
+from dicom_series import PLANES, load_series
+from dispatcher import DispatcherBusy, ThreadedDispatcher, estimate_tokens
+from image_processing import (
+    decode_uploaded_dicom,
+    is_dicom_upload,
+    is_tiff_upload,
+    open_tiff,
+    process_uploaded_file,
+    render_dicom,
+    render_volume,
+)
+from image_cache import DECODED_UPLOADS, content_hash
+from image_previews import ANALYSIS_MAX_SIDE, analysis_image, display_preview
+from model_backends import MODEL_BACKEND, get_backend
+from prompts import VISION_QUERY
+from resilience import (
+    ANALYSIS_POLICY,
+    HEDGED_ANALYSIS_POLICY,
+    CircuitOpen,
+    call_with_policy,
+    check_abandoned,
+    stream_with_policy,
+)
+from search_layer import SEARCH_METRICS
+from slide_pyramid import ROI_SIDES, SlidePyramid, is_pyramid, mark_region
+from temp_artifacts import new_session_id, sweep_stale_artifacts, temp_artifact
+
+@st.cache_resource
+def sweep_temp_artifacts_on_startup():
+    """Remove artifacts leaked by previous runs, once per server process."""
+    return sweep_stale_artifacts()
+
+sweep_temp_artifacts_on_startup()
+
+@st.cache_resource
+def analysis_dispatcher():
+    """Rate limits and concurrency cap for agent calls from all sessions."""
+    return ThreadedDispatcher()
+
+@st.cache_resource
+def analysis_results():
+    """Persistent analysis result cache shared by all sessions."""
+    return AnalysisCache()
 
 # Initialize session state
 if "GOOGLE_API_KEY" not in st.session_state:
     st.session_state.GOOGLE_API_KEY = None
 
+# Unique id that namespaces this session's temp artifacts
+if "session_id" not in st.session_state:
+    st.session_state.session_id = new_session_id()
+
 # Initialize analyze_clicked state
 if "analyze_clicked" not in st.session_state:
     st.session_state.analyze_clicked = False
@@ -18,77 +67,42 @@ if "analyze_clicked" not in st.session_state:
 def on_analyze_click():
     st.session_state.analyze_clicked = True
 
-def process_dicom(dicom_file):
-    """Process DICOM file and convert to PIL Image."""
-    try:
-        # Read the DICOM file
-        ds = pydicom.dcmread(dicom_file)
-        
-        # Get pixel array and rescale to 8-bit
-        pixel_array = ds.pixel_array
-        
-        # Normalize to 8-bit range
-        if pixel_array.max() > 255:
-            pixel_array = ((pixel_array - pixel_array.min()) / 
-                         (pixel_array.max() - pixel_array.min()) * 255).astype(np.uint8)
-        
-        # Convert to PIL Image
-        return Image.fromarray(pixel_array)
-    except Exception as e:
-        raise Exception(f"Error processing DICOM file: {str(e)}")
+def render_streamed_report(deltas):
+    """Render a streamed markdown report, finalizing each section as the next begins."""
+    report = ""
+    section_start = 0
+    placeholder = st.empty()
+    for delta in deltas:
+        report += delta
+        section_end = completed_sections_end(report, section_start)
+        if section_end > section_start:
+            placeholder.markdown(report[section_start:section_end])
+            placeholder = st.empty()
+            section_start = section_end
+        # Only the section still being written is re-rendered
+        placeholder.markdown(report[section_start:])
+    return report
 
-def process_tiff(uploaded_file):
-    """Process TIFF file specifically."""
-    try:
-        # Open directly from the uploaded file
-        image = Image.open(uploaded_file)
-        
-        # Convert to RGB if needed
-        if image.mode not in ('RGB', 'L'):
-            image = image.convert('RGB')
-        
-        # Create a copy in memory to ensure the file is fully loaded
-        return image.copy()
-    except Exception as e:
-        raise Exception(f"Error processing TIFF file: {str(e)}")
+def upload_hash(uploaded_file):
+    """Content hash of an upload, computed once per upload in this session."""
+    hashes = st.session_state.setdefault("upload_hashes", {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = content_hash(uploaded_file)
+    return hashes[uploaded_file.file_id]
 
-def process_uploaded_file(uploaded_file):
-    """Process uploaded file based on its format."""
-    try:
-        file_extension = uploaded_file.name.lower().split('.')[-1]
-        
-        if file_extension in ['dcm', 'dicom']:
-            # Save DICOM file temporarily
-            temp_path = "temp_dicom_file.dcm"
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            try:
-                image = process_dicom(temp_path)
-            finally:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                    
-        elif file_extension in ['tif', 'tiff']:
-            image = process_tiff(uploaded_file)
-            
-        else:  # For other supported formats
-            image = Image.open(uploaded_file)
-            
-            # Convert to RGB if needed
-            if image.mode not in ('RGB', 'L'):
-                image = image.convert('RGB')
-        
-        return image
-    except Exception as e:
-        raise Exception(f"Error processing uploaded file: {str(e)}")
+def load_image(image):
+    """Force lazily opened images to decode so they no longer need the upload."""
+    image.load()
+    return image
 
 # Sidebar Configuration
 with st.sidebar:
     st.title("ℹ️ Configuration")
     
     # API Key Configuration
-    if not st.session_state.GOOGLE_API_KEY:
+    if not get_backend(MODEL_BACKEND).needs_api_key:
+        st.success(f"Using the local {MODEL_BACKEND} backend ({MODEL_ID}), no API key needed")
+    elif not st.session_state.GOOGLE_API_KEY:
         api_key = st.text_input(
             "Enter your Google API Key:",
             type="password"
@@ -104,9 +118,53 @@ with st.sidebar:
     else:
         st.success("API Key is configured")
         if st.button("🔄 Reset API Key"):
+            evict_agents(st.session_state.GOOGLE_API_KEY)
             st.session_state.GOOGLE_API_KEY = None
             st.rerun()
     
+    st.toggle(
+        "Stream analysis output",
+        value=True,
+        key="stream_analysis",
+        help="Show the report section by section while it is generated"
+    )
+    
+    st.toggle(
+        "Reuse cached analyses",
+        value=True,
+        key="reuse_cached_analyses",
+        help="Return a stored report when the same images are analysed with the same prompt and model"
+    )
+    
+    st.toggle(
+        "Hedge slow analyses",
+        value=False,
+        key="hedge_analysis",
+        help="When a run is slower than 95% of recent ones, start a second one and keep whichever "
+             "finishes first (uses extra quota; not available while streaming)"
+    )
+    
+    cache_stats = DECODED_UPLOADS.stats()
+    st.caption(
+        f"Decoded image cache: {cache_stats['hit_rate']:.0%} hit rate "
+        f"({cache_stats['hits']} hits / {cache_stats['misses']} misses), "
+        f"{cache_stats['entries']} entries, "
+        f"{cache_stats['bytes'] / 1e6:.0f} of {cache_stats['max_bytes'] / 1e6:.0f} MB"
+    )
+    result_stats = analysis_results().stats()
+    st.caption(
+        f"Analysis cache: {result_stats['hit_rate']:.0%} hit rate, "
+        f"{result_stats['saved_seconds']:.0f}s of API time saved, "
+        f"{result_stats['entries']} stored reports"
+    )
+    search_stats = SEARCH_METRICS.stats()
+    if search_stats["queries"]:
+        st.caption(
+            f"Web search: {search_stats['queries']} recent queries, "
+            f"{search_stats['cached']} from cache, live p50 {search_stats['p50']:.1f}s / "
+            f"p95 {search_stats['p95']:.1f}s"
+        )
+    
     st.info(
         "This tool provides AI-powered analysis of medical imaging data using "
         "advanced computer vision and radiological expertise."
@@ -117,65 +175,22 @@ with st.sidebar:
         "Do not make medical decisions based solely on this analysis."
     )
 
-# Initialize medical agent with proper error handling
+# Initialize medical agents with proper error handling; the pool is shared
+# across reruns and sessions, so clients are only built once per API key
 try:
-    if st.session_state.GOOGLE_API_KEY:
-        medical_agent = Agent(
-            model=Gemini(
-                api_key=st.session_state.GOOGLE_API_KEY,
-                id="gemini-1.5-flash"
-            ),
-            tools=[DuckDuckGo()],
-            markdown=True
-        )
+    if st.session_state.GOOGLE_API_KEY or not get_backend(MODEL_BACKEND).needs_api_key:
+        # Image findings use a tool-less agent; research gets the search tools
+        vision_agents = agent_pool(st.session_state.GOOGLE_API_KEY or "", tools=())
+        medical_agents = agent_pool(st.session_state.GOOGLE_API_KEY or "")
     else:
-        medical_agent = None
+        medical_agents = vision_agents = None
 except Exception as e:
-    st.error(f"Error initializing Gemini model: {str(e)}")
-    medical_agent = None
+    st.error(f"Error initializing {MODEL_BACKEND} model: {str(e)}")
+    medical_agents = vision_agents = None
 
-if not medical_agent:
+if not medical_agents:
     st.warning("Please configure your API key in the sidebar to continue")
 
-# Medical Analysis Query
-query = """
-You are a highly skilled medical imaging expert with extensive knowledge in radiology and diagnostic imaging. Analyze the patient's medical image and structure your response as follows:
-
-### 1. Image Type & Region
-- Specify imaging modality (X-ray/MRI/CT/Ultrasound/etc.)
-- Identify the patient's anatomical region and positioning
-- Comment on image quality and technical adequacy
-
-### 2. Key Findings
-- List primary observations systematically
-- Note any abnormalities in the patient's imaging with precise descriptions
-- Include measurements and densities where relevant
-- Describe location, size, shape, and characteristics
-- Rate severity: Normal/Mild/Moderate/Severe
-
-### 3. Diagnostic Assessment
-- Provide primary diagnosis with confidence level
-- List differential diagnoses in order of likelihood
-- Support each diagnosis with observed evidence from the patient's imaging
-- Note any critical or urgent findings
-
-### 4. Patient-Friendly Explanation
-- Explain the findings in simple, clear language that the patient can understand
-- Avoid medical jargon or provide clear definitions
-- Include visual analogies if helpful
-- Address common patient concerns related to these findings
-
-### 5. Research Context
-IMPORTANT: Use the DuckDuckGo search tool to:
-- Find recent medical literature about similar cases
-- Search for standard treatment protocols
-- Provide a list of relevant medical links
-- Research any relevant technological advances
-- Include 2-3 key references to support your analysis
-
-Format your response using clear markdown headers and bullet points. Be concise yet thorough.
-"""
-
 st.title("🏥 Medical Imaging Diagnosis Agent")
 st.write("Upload a medical image for professional analysis")
 
@@ -185,38 +200,180 @@ image_container = st.container()
 analysis_container = st.container()
 
 with upload_container:
-    uploaded_file = st.file_uploader(
-        "Upload Medical Image",
-        type=["jpg", "jpeg", "png", "tiff", "tif", "dcm", "dicom"],
-        help="Supported formats: JPG, JPEG, PNG, TIFF, DICOM"
-    )
+    upload_mode = st.radio("Upload mode", ["Single image", "DICOM series"], horizontal=True)
+    uploaded_file = None
+    series_files = []
+    if upload_mode == "DICOM series":
+        series_files = st.file_uploader(
+            "Upload DICOM Series",
+            # Any name: files are recognized by content, so extensionless PACS exports work
+            type=None,
+            accept_multiple_files=True,
+            help="Upload all slices of a CT/MR study, or a zip containing them"
+        )
+    else:
+        uploaded_file = st.file_uploader(
+            "Upload Medical Image",
+            type=None,
+            help="Supported formats: JPG, JPEG, PNG, TIFF, DICOM (recognized by content, "
+                 "so files without an extension work)"
+        )
 
 # Initialize variables
 image = None
 resized_image = None
+# Resized images sent to the agent (several when analysing a cine loop)
+analysis_images = []
+# Frames of a multi-frame DICOM to analyze instead, rendered only once Analyze is clicked
+frame_sample = []
+# Header metadata of DICOM uploads, passed on to the agent
+dicom_summary = None
 
-if uploaded_file is not None:
+if uploaded_file is not None or series_files:
     with image_container:
         try:
             # Process the uploaded file
-            image = process_uploaded_file(uploaded_file)
+            frames = None
+            # Extra MPR/MIP views sent to the agent in series mode
+            series_views = []
+            # Whole-slide mode: native-resolution region sent along with the overview
+            slide = slide_region = None
+            if series_files:
+                # Stack the series once per set of uploads
+                series_key = ("series",) + tuple(sorted(upload_hash(f) for f in series_files))
+                volumes = DECODED_UPLOADS.get(series_key)
+                if volumes is None:
+                    with st.spinner("🔄 Building volume..."):
+                        volumes = load_series(series_files)
+                    DECODED_UPLOADS.put(series_key, volumes)
+                volume = volumes[0]
+                if len(volumes) > 1:
+                    volume = st.selectbox("Series", volumes, format_func=lambda v: v.label)
+                dicom_summary = summarize_dataset(volume.header)
+                window = st.selectbox(
+                    "🪟 DICOM Window",
+                    WINDOW_OPTIONS,
+                    help="Default uses the window stored in the file; presets are in Hounsfield units"
+                )
+                plane = st.radio("Plane", PLANES, horizontal=True)
+                show_mip = st.checkbox("Maximum intensity projection")
+                slice_index = None
+                if not show_mip:
+                    slice_count = volume.plane_size(plane)
+                    slice_index = st.slider("Slice", 1, slice_count, slice_count // 2 + 1) - 1
+                image_key = series_key + (volume.series_uid, window, plane, slice_index, show_mip)
+                image = DECODED_UPLOADS.get_or_create(
+                    image_key,
+                    lambda: render_volume(volume, plane, slice_index, window, show_mip)
+                )
+                extra_views = st.multiselect(
+                    "Additional views to analyze",
+                    [f"{p} MPR" for p in PLANES] + [f"{p} MIP" for p in PLANES]
+                )
+                for extra_view in extra_views:
+                    view_plane, view_kind = extra_view.split()
+                    series_views.append(analysis_image(
+                        series_key + (volume.series_uid, window, view_plane, None, view_kind == "MIP"),
+                        lambda: render_volume(volume, view_plane, window=window, mip=view_kind == "MIP")
+                    ))
+            elif is_dicom_upload(uploaded_file):
+                # Decode once per upload; changing the window only re-applies a LUT
+                frames = DECODED_UPLOADS.get_or_create(
+                    ("dicom", upload_hash(uploaded_file)),
+                    lambda: decode_uploaded_dicom(uploaded_file)
+                )
+                dicom_summary = summarize_dataset(frames.ds)
+                st.caption(describe_header(dicom_summary))
+                window = st.selectbox(
+                    "🪟 DICOM Window",
+                    WINDOW_OPTIONS,
+                    help="Default uses the window stored in the file; presets are in Hounsfield units"
+                )
+                frame_index = 0
+                if len(frames) > 1:
+                    # Only the frames scrubbed to are decoded
+                    frame_index = st.slider("🎞️ Frame", 1, len(frames), 1) - 1
+                image_key = ("dicom", upload_hash(uploaded_file), window, frame_index)
+                image = DECODED_UPLOADS.get_or_create(
+                    image_key, lambda: render_dicom(frames, window, frame_index)
+                )
+            elif is_tiff_upload(uploaded_file):
+                # Only page directories are parsed here; pixels are read per tile on demand
+                tiff = DECODED_UPLOADS.get_or_create(
+                    ("tiff", upload_hash(uploaded_file)), lambda: open_tiff(uploaded_file)
+                )
+                if is_pyramid(tiff):
+                    slide = SlidePyramid(tiff)
+                    st.caption(slide.label())
+                    # The overview comes from the nearest pyramid level, never from full resolution
+                    image_key = ("slide", upload_hash(uploaded_file))
+                    image = DECODED_UPLOADS.get_or_create(image_key, slide.overview)
+                    if st.checkbox("🔬 Analyze a region at native resolution"):
+                        center_x = st.slider("Region center, horizontal (%)", 0, 100, 50)
+                        center_y = st.slider("Region center, vertical (%)", 0, 100, 50)
+                        side = st.select_slider("Region size (pixels)", ROI_SIDES, value=1024)
+                        region_center = (slide.width * center_x // 100, slide.height * center_y // 100)
+                        region_key = image_key + region_center + (side,)
+                        slide_region, region_image = DECODED_UPLOADS.get_or_create(
+                            region_key, lambda: slide.roi(*region_center, side)
+                        )
+                        series_views.append(analysis_image(region_key, lambda: region_image))
+                else:
+                    page_index = 0
+                    if len(tiff) > 1:
+                        page_index = st.selectbox(
+                            "📄 Page",
+                            range(len(tiff)),
+                            format_func=lambda i: f"Page {i + 1} of {len(tiff)}: {tiff.pages[i].label()}"
+                        )
+                    image_key = ("tiff", upload_hash(uploaded_file), page_index)
+                    image = DECODED_UPLOADS.get_or_create(
+                        image_key, lambda: tiff.render(page_index, max_side=ANALYSIS_MAX_SIDE)
+                    )
+            else:
+                image_key = ("image", upload_hash(uploaded_file))
+                image = DECODED_UPLOADS.get_or_create(
+                    image_key,
+                    lambda: load_image(process_uploaded_file(uploaded_file, st.session_state.session_id))
+                )
             
             # Center the image using columns
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
                 if image is not None:
-                    # Calculate aspect ratio for resizing
-                    width, height = image.size
-                    aspect_ratio = width / height
-                    new_width = 500
-                    new_height = int(new_width / aspect_ratio)
-                    resized_image = image.resize((new_width, new_height))
+                    # Display thumbnail and analysis-resolution image are cached separately
+                    resized_image = display_preview(image_key, lambda: image)
+                    analysis_images = [analysis_image(image_key, lambda: image)] + series_views
                     
+                    if slide_region is not None:
+                        resized_image = mark_region(resized_image, slide, slide_region)
                     st.image(
                         resized_image,
                         caption="Uploaded Medical Image",
                         use_container_width=True
                     )
+                    if slide_region is not None:
+                        st.image(
+                            series_views[-1],
+                            caption=f"Region {slide_region[2]}×{slide_region[3]} at "
+                                    f"({slide_region[0]}, {slide_region[1]})",
+                            use_container_width=True
+                        )
+                    
+                    if frames is not None and len(frames) > 1:
+                        frame_options = ["Current frame", "Uniform sample"]
+                        if key_frames(frames.ds):
+                            frame_options.append("Key frames")
+                        frame_choice = st.selectbox("Frames to analyze", frame_options)
+                        if frame_choice == "Uniform sample":
+                            sample_size = len(frames)
+                            if len(frames) > 2:
+                                sample_size = st.slider(
+                                    "Number of frames", 2, min(16, len(frames)), min(8, len(frames))
+                                )
+                            frame_sample = uniform_sample(len(frames), sample_size)
+                        elif frame_choice == "Key frames":
+                            frame_sample = key_frames(frames.ds)
                     
                     st.button(
                         "🔍 Analyze Image",
@@ -229,38 +386,135 @@ if uploaded_file is not None:
     
     with analysis_container:
         if st.session_state.analyze_clicked:
-            if not medical_agent:
+            if not medical_agents:
                 st.error("Please configure your API key before analyzing images.")
             else:
-                image_path = "temp_medical_image.png"
                 try:
-                    # Save image with error handling
-                    if resized_image is not None:
-                        resized_image.save(image_path, format='PNG')
-                        
-                        with st.spinner("🔄 Analyzing image... Please wait."):
+                    if frame_sample:
+                        # Decoded here rather than on every rerun, which would cycle
+                        # the sample through the frame cache each time a widget changes
+                        analysis_images = [
+                            analysis_image(
+                                ("dicom", upload_hash(uploaded_file), window, index),
+                                lambda index=index: render_dicom(frames, window, index)
+                            )
+                            for index in frame_sample
+                        ]
+                    # Save images to per-session temp files that are removed afterwards
+                    if analysis_images:
+                        with ExitStack() as stack:
+                            image_paths = []
+                            for image_to_save in analysis_images:
+                                image_path = stack.enter_context(
+                                    temp_artifact(".png", st.session_state.session_id)
+                                )
+                                image_to_save.save(image_path, format='PNG')
+                                image_paths.append(image_path)
+                            
                             try:
-                                response = medical_agent.run(query, images=[image_path])
+                                vision_query = VISION_QUERY
+                                if dicom_summary:
+                                    vision_query += header_prompt_context(dicom_summary)
+                                reuse = st.session_state.reuse_cached_analyses
+                                dispatcher = analysis_dispatcher()
+                                timing = {}
+                                # The vision phase runs without tools, so its key has none
+                                cache_key = analysis_key(image_paths, vision_query, model_label(), ())
+                                cached = analysis_results().get(cache_key) if reuse else None
+                                research = {}
+
+                                def begin_research(findings):
+                                    """Look up or start the research phase as soon as findings exist."""
+                                    research["key"] = analysis_key(
+                                        [], research_prompt(findings), model_label(), DEFAULT_TOOLS
+                                    )
+                                    research["cached"] = analysis_results().get(research["key"]) if reuse else None
+                                    research["started"] = time.perf_counter()
+                                    if research["cached"] is None:
+                                        research["job"] = start_research(medical_agents, dispatcher, findings)
+
                                 st.markdown("### 📋 Analysis Results")
                                 st.markdown("---")
-                                st.markdown(response.content)
+                                if cached is not None:
+                                    report, saved_latency = cached
+                                    begin_research(findings_text(report, complete=True))
+                                    st.markdown(report)
+                                else:
+                                    tokens = estimate_tokens(vision_query, len(image_paths))
+
+                                    def agent_stream():
+                                        with dispatcher.slot(tokens, block=False), vision_agents.lease() as agent:
+                                            check_abandoned()
+                                            yield from stream_text(agent, vision_query, image_paths, timing)
+
+                                    def agent_run():
+                                        # Hedged runs race each other, so each keeps its own timing
+                                        run_timing = {}
+                                        with dispatcher.slot(tokens, block=False), vision_agents.lease() as agent:
+                                            check_abandoned()
+                                            return run_text(agent, vision_query, image_paths, run_timing), run_timing
+
+                                    if st.session_state.stream_analysis:
+                                        report = render_streamed_report(research_when_ready(
+                                            stream_with_policy(agent_stream, ANALYSIS_POLICY, "model"),
+                                            begin_research,
+                                        ))
+                                    else:
+                                        policy = HEDGED_ANALYSIS_POLICY if st.session_state.hedge_analysis else ANALYSIS_POLICY
+                                        with st.spinner("🔄 Analyzing image... Please wait."):
+                                            report, timing = call_with_policy(agent_run, policy, "model")
+                                        begin_research(findings_text(report, complete=True))
+                                        st.markdown(report)
+                                    analysis_results().put(cache_key, report, timing["total"])
+                                findings_shown = time.perf_counter()
+
+                                # Research runs in the background and is appended when it arrives
+                                research_timing = None
+                                if research["cached"] is not None:
+                                    st.markdown(research["cached"][0])
+                                else:
+                                    try:
+                                        with st.spinner("🔎 Adding research context..."):
+                                            section, research_timing = research["job"].result()
+                                        research_timing["phase"] = time.perf_counter() - research["started"]
+                                        research_timing["extra_wait"] = time.perf_counter() - findings_shown
+                                        analysis_results().put(research["key"], section, research_timing["total"])
+                                        st.markdown(section)
+                                    except Exception as e:
+                                        st.warning(f"Research context unavailable: {e}")
                                 st.markdown("---")
                                 st.caption(
                                     "Note: This analysis is generated by AI and should be reviewed by "
                                     "a qualified healthcare professional."
                                 )
+                                if cached is not None:
+                                    st.caption(f"⚡ Findings served from cache, saved about {saved_latency:.1f}s")
+                                else:
+                                    st.caption(
+                                        f"⏱️ Findings: first output after {timing['first_token']:.1f}s, "
+                                        f"complete after {timing['total']:.1f}s"
+                                    )
+                                if research_timing is not None:
+                                    st.caption(
+                                        f"🔎 Research: {research_timing['phase']:.1f}s in the background, "
+                                        f"{research_timing['extra_wait']:.1f}s after the findings were shown"
+                                    )
+                                elif research["cached"] is not None:
+                                    st.caption("⚡ Research served from cache")
+                                st.session_state.analysis_timings = (
+                                    st.session_state.get("analysis_timings", [])
+                                    + [{"vision": None if cached else timing, "research": research_timing}]
+                                )[-50:]
+                            except (CircuitOpen, DispatcherBusy) as e:
+                                st.warning(f"⏳ {e}")
+                            except TimeoutError as e:
+                                st.error(f"Analysis timed out: {e}. Please try again.")
                             except Exception as e:
                                 st.error(f"Analysis error: {str(e)}")
                     else:
                         st.error("Error: Image processing failed")
                 except Exception as e:
                     st.error(f"Error saving image: {str(e)}")
-                finally:
-                    if os.path.exists(image_path):
-                        try:
-                            os.remove(image_path)
-                        except Exception as e:
-                            st.warning(f"Could not remove temporary file: {str(e)}")
                             
                 # Reset the analyze clicked state
                 st.session_state.analyze_clicked = False
@@ -0,0 +1,224 @@
+"""Headless batch analysis of a folder (or manifest) of medical images.
+
+Usage:
+    python batch_cli.py IMAGES_DIR_OR_MANIFEST --output results.jsonl [--markdown-dir reports]
+
+Images are decoded in a process pool with the same helpers as the app, then
+analysed with the same query under a bounded number of concurrent agent
+calls that respect the requests/tokens-per-minute quota, with timeouts and
+retries for transient failures. Results are appended to a JSONL file as
+they complete; rerunning with the same output skips images that already
+succeeded.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from agent_factory import MODEL_ID, agent_pool
+from analysis_stream import run_text
+from dicom_header import header_prompt_context
+from dispatcher import (
+    BATCH_PRIORITY,
+    REQUESTS_PER_MINUTE,
+    TOKENS_PER_MINUTE,
+    ThreadedDispatcher,
+    estimate_tokens,
+)
+from image_previews import downscale, side_fit
+from image_processing import (
+    UPLOAD_DECODERS,
+    inspect_uploaded_dicom,
+    is_dicom_upload,
+    load_local_file,
+    process_uploaded_file,
+)
+from model_backends import BACKENDS, MODEL_BACKEND, get_backend
+from prompts import ANALYSIS_QUERY
+from resilience import ANALYSIS_POLICY, call_with_policy, check_abandoned
+from temp_artifacts import temp_artifact
+from upload_formats import sniff_path
+
+def collect_inputs(source):
+    """Image paths from a directory walk or a manifest (one path per line, or JSONL with "path")."""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                path = os.path.join(root, name)
+                # By content, so extensionless PACS exports are included
+                if sniff_path(path) in UPLOAD_DECODERS:
+                    paths.append(path)
+        return sorted(paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = json.loads(line)["path"] if line.startswith("{") else line
+            paths.append(path if os.path.isabs(path) else os.path.join(base, path))
+    return paths
+
+def completed_paths(output_path):
+    """Paths already analysed successfully in a previous run."""
+    done = set()
+    if os.path.exists(output_path):
+        with open(output_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A line cut short by an interrupted run
+                    continue
+                if record.get("status") == "ok":
+                    done.add(record["path"])
+    return done
+
+def prepare_image(path):
+    """Decode one input (in a worker process) into analysis-resolution PNG bytes."""
+    upload = load_local_file(path)
+    summary = inspect_uploaded_dicom(upload) if is_dicom_upload(upload) else None
+    image = process_uploaded_file(upload)
+    image = downscale(image, side_fit(image.size))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue(), summary
+
+def analyse(agents, dispatcher, path, png_bytes, summary):
+    """Run the agent on one prepared image; returns a result record."""
+    prompt = ANALYSIS_QUERY
+    if summary:
+        prompt += header_prompt_context(summary)
+    with temp_artifact(".png", "batch") as image_path:
+        with open(image_path, "wb") as f:
+            f.write(png_bytes)
+
+        def agent_run():
+            timing = {}
+            with dispatcher.slot(estimate_tokens(prompt), BATCH_PRIORITY), agents.lease() as agent:
+                check_abandoned()
+                return run_text(agent, prompt, [image_path], timing), timing
+
+        report, timing = call_with_policy(agent_run, ANALYSIS_POLICY, "model")
+    return {"path": path, "status": "ok", "report": report, "latency": timing["total"]}
+
+def write_markdown(markdown_dir, record):
+    # Flatten the path so same-named images from different folders don't collide
+    name = os.path.splitext(os.path.abspath(record["path"]).strip(os.sep))[0].replace(os.sep, "__")
+    with open(os.path.join(markdown_dir, f"{name}.md"), "w") as f:
+        f.write(f"# {record['path']}\n\n{record['report']}\n")
+
+def run_batch(paths, output_path, api_key, concurrency=4, decode_workers=None, markdown_dir=None,
+              requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+              backend=MODEL_BACKEND, model_id=None):
+    """Decode and analyse ``paths``, appending one JSONL record per image."""
+    if markdown_dir:
+        os.makedirs(markdown_dir, exist_ok=True)
+    model_id = model_id or (MODEL_ID if backend == MODEL_BACKEND else get_backend(backend).default_model)
+    agents = agent_pool(api_key, model_id, backend=backend)
+    # Agent calls wait here for a concurrency slot and rate-limit budget
+    dispatcher = ThreadedDispatcher(
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        max_in_flight=concurrency,
+    )
+    write_lock = threading.Lock()
+    # Bounds both in-flight agent calls and decoded images waiting for one
+    slots = threading.BoundedSemaphore(concurrency * 2)
+    counts = {"ok": 0, "error": 0}
+    start = time.perf_counter()
+
+    def record_result(record):
+        with write_lock:
+            with open(output_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            if markdown_dir and record["status"] == "ok":
+                write_markdown(markdown_dir, record)
+            counts[record["status"]] += 1
+            finished = counts["ok"] + counts["error"]
+            elapsed = time.perf_counter() - start
+            print(
+                f"[{finished}/{len(paths)}] {record['status']:5s} {record['path']} "
+                f"({finished / elapsed * 60:.1f} images/min)",
+                file=sys.stderr
+            )
+
+    def analyse_and_record(path, png_bytes, summary):
+        try:
+            record_result(analyse(agents, dispatcher, path, png_bytes, summary))
+        except Exception as e:
+            record_result({"path": path, "status": "error", "error": f"Analysis error: {str(e)}"})
+        finally:
+            slots.release()
+
+    # Only decode a little ahead of the agent calls to keep memory bounded
+    decode_ahead = (decode_workers or os.cpu_count() or 1) * 2
+    remaining = iter(paths)
+    window = deque()
+
+    with ProcessPoolExecutor(decode_workers) as decoders, ThreadPoolExecutor(concurrency) as callers:
+        def refill():
+            while len(window) < decode_ahead:
+                path = next(remaining, None)
+                if path is None:
+                    break
+                window.append((path, decoders.submit(prepare_image, path)))
+
+        refill()
+        while window:
+            path, future = window.popleft()
+            refill()
+            slots.acquire()
+            try:
+                png_bytes, summary = future.result()
+            except Exception as e:
+                slots.release()
+                record_result({"path": path, "status": "error", "error": str(e)})
+                continue
+            callers.submit(analyse_and_record, path, png_bytes, summary)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Done: {counts['ok']} analysed, {counts['error']} failed in {elapsed:.1f}s "
+        f"({len(paths) / elapsed * 60 if elapsed else 0:.1f} images/min)",
+        file=sys.stderr
+    )
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch medical image analysis without the Streamlit UI.")
+    parser.add_argument("source", help="Directory of images, or a manifest file listing image paths")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--markdown-dir", help="Also write one Markdown report per image here")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent agent calls")
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MINUTE, help="Requests per minute quota")
+    parser.add_argument("--tpm", type=int, default=TOKENS_PER_MINUTE, help="Tokens per minute quota")
+    parser.add_argument("--decode-workers", type=int, help="Decoder processes (default: CPU count)")
+    parser.add_argument("--backend", default=MODEL_BACKEND, choices=sorted(BACKENDS),
+                        help=f"Model backend (default: {MODEL_BACKEND}, from $MODEL_BACKEND)")
+    parser.add_argument("--model", help="Model id (default: the backend's default model)")
+    parser.add_argument("--api-key", default=os.environ.get("GOOGLE_API_KEY"),
+                        help="Google API key (default: $GOOGLE_API_KEY)")
+    args = parser.parse_args(argv)
+
+    if not args.api_key and get_backend(args.backend).needs_api_key:
+        parser.error("a Google API key is required (--api-key or GOOGLE_API_KEY)")
+
+    paths = collect_inputs(args.source)
+    done = completed_paths(args.output)
+    pending = [path for path in paths if path not in done]
+    print(f"{len(paths)} images, {len(paths) - len(pending)} already done", file=sys.stderr)
+    if pending:
+        run_batch(pending, args.output, args.api_key or "", args.concurrency,
+                  args.decode_workers, args.markdown_dir, args.rpm, args.tpm,
+                  args.backend, args.model)
+
+if __name__ == "__main__":
+    main()
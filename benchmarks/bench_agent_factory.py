@@ -0,0 +1,36 @@
+"""Per-rerun agent startup cost: building a new agent vs leasing from the pool.
+
+No requests are sent; a dummy API key is enough to construct the clients.
+
+Run from the repository root:  python -m benchmarks.bench_agent_factory
+"""
+import time
+from agent_factory import agent_pool, build_agent, evict_agents
+
+API_KEY = "benchmark-dummy-key"
+
+
+def timed(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+
+def lease_once():
+    with agent_pool(API_KEY).lease():
+        pass
+
+
+def main(repeats=50):
+    rebuild = timed(lambda: build_agent(API_KEY), repeats)
+    first = timed(lease_once, 1)
+    cached = timed(lease_once, repeats)
+    evict_agents(API_KEY)
+    print(f"rebuild every rerun   {rebuild * 1e3:8.2f} ms")
+    print(f"first pool lookup     {first * 1e3:8.2f} ms")
+    print(f"cached pool lease     {cached * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Latency of the same analysis request on each model backend.
+
+Every backend gets the app's query and the same generated radiograph-sized
+image, through the same agent pool and streaming path as the app, so the
+numbers are directly comparable.
+
+Run from the repository root:
+    python -m benchmarks.bench_backends [BACKEND[:MODEL] ...] [--runs N]
+
+Without arguments the offline stub is measured, plus Gemini when
+GOOGLE_API_KEY is set. Add e.g. ``ollama:llava`` to include a local model.
+"""
+import argparse
+import os
+import numpy as np
+from PIL import Image
+from agent_factory import agent_pool
+from analysis_stream import stream_text
+from model_backends import get_backend
+from prompts import ANALYSIS_QUERY
+from temp_artifacts import temp_artifact
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def test_image(size=1024, seed=0):
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 200, size, dtype=np.float32)[None, :]
+    pixels = gradient + rng.normal(0, 20, (size, size))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def benchmark_backend(backend, model_id, image_path, runs, api_key=""):
+    """First-token and total latencies of ``runs`` streamed analyses."""
+    # No web search, so only the model itself is timed
+    agents = agent_pool(api_key, model_id, tools=(), backend=backend)
+    timings = []
+    for _ in range(runs):
+        timing = {}
+        with agents.lease() as agent:
+            for _ in stream_text(agent, ANALYSIS_QUERY, [image_path], timing):
+                pass
+        timings.append(timing)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("backends", nargs="*", help="BACKEND or BACKEND:MODEL")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    api_key = os.environ.get("GOOGLE_API_KEY", "")
+    backends = args.backends or (["stub", "gemini"] if api_key else ["stub"])
+    with temp_artifact(".png", "bench") as image_path:
+        test_image().save(image_path)
+        for spec in backends:
+            backend, _, model_id = spec.partition(":")
+            model_id = model_id or get_backend(backend).default_model
+            try:
+                timings = benchmark_backend(backend, model_id, image_path, args.runs, api_key)
+            except Exception as e:
+                print(f"{backend + '/' + model_id:28s} failed: {e}")
+                continue
+            first = [timing["first_token"] for timing in timings]
+            total = [timing["total"] for timing in timings]
+            print(
+                f"{backend + '/' + model_id:28s} "
+                f"first token p50 {percentile(first, 0.5):6.2f}s p95 {percentile(first, 0.95):6.2f}s  "
+                f"total p50 {percentile(total, 0.5):6.2f}s p95 {percentile(total, 0.95):6.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
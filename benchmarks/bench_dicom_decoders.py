@@ -0,0 +1,86 @@
+"""Decode time per transfer syntax and installed decoder, on locally encoded data.
+
+Syntaxes without a local encoder (JPEG-LS, JPEG Lossless) are reported as
+skipped; their decoders are still listed so the registry order is visible.
+
+Run from the repository root:  python -m benchmarks.bench_dicom_decoders
+"""
+import io
+import time
+import numpy as np
+import pydicom
+from PIL import Image
+from pydicom import uid
+from pydicom.encaps import encapsulate
+from benchmarks.datasets import make_dicom_bytes
+from dicom_decoders import DECODERS, DECODER_PREFERENCE, available_decoders
+
+
+def pillow_encoded(ds, transfer_syntax, image_format, **options):
+    """Re-encode the dataset's pixels with Pillow into an encapsulated dataset."""
+    pixels = ds.pixel_array
+    if image_format == "JPEG":
+        pixels = (pixels >> 4).astype(np.uint8)
+        ds.BitsAllocated, ds.BitsStored, ds.HighBit = 8, 8, 7
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format=image_format, **options)
+    ds.PixelData = encapsulate([buffer.getvalue()])
+    ds["PixelData"].is_undefined_length = True
+    ds.file_meta.TransferSyntaxUID = transfer_syntax
+    return ds
+
+
+def make_datasets(rows=2048, columns=2048):
+    def base():
+        return pydicom.dcmread(io.BytesIO(make_dicom_bytes(rows, columns)))
+
+    datasets = {uid.ExplicitVRLittleEndian: base}
+
+    def rle():
+        ds = base()
+        ds.compress(uid.RLELossless)
+        return ds
+    datasets[uid.RLELossless] = rle
+    datasets[uid.JPEGBaseline8Bit] = lambda: pillow_encoded(
+        base(), uid.JPEGBaseline8Bit, "JPEG", quality=95)
+    datasets[uid.JPEG2000Lossless] = lambda: pillow_encoded(
+        base(), uid.JPEG2000Lossless, "JPEG2000", irreversible=False)
+    return datasets
+
+
+def main(repeats=5):
+    datasets = make_datasets()
+    for transfer_syntax in [uid.ExplicitVRLittleEndian] + list(DECODER_PREFERENCE):
+        names = available_decoders(transfer_syntax)
+        print(f"{transfer_syntax.name}: decoders {names or 'none installed'}")
+        if transfer_syntax not in datasets:
+            print("  skipped (no local encoder)")
+            continue
+        try:
+            template = datasets[transfer_syntax]()
+        except Exception as e:
+            print(f"  skipped (encoding failed: {e})")
+            continue
+        for name in names:
+            elapsed = []
+            for _ in range(repeats):
+                ds = pydicom.dcmread(io.BytesIO(_serialize(template)))
+                start = time.perf_counter()
+                try:
+                    DECODERS[name][0](ds)
+                except Exception as e:
+                    print(f"  {name:10s} failed: {e}")
+                    break
+                elapsed.append(time.perf_counter() - start)
+            else:
+                print(f"  {name:10s} {np.median(elapsed) * 1e3:8.2f} ms")
+
+
+def _serialize(ds):
+    buffer = io.BytesIO()
+    ds.save_as(buffer, write_like_original=False)
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    main()
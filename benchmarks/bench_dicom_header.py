@@ -0,0 +1,28 @@
+"""Header-only DICOM read vs full read + decode.
+
+Run from the repository root:  python -m benchmarks.bench_dicom_header
+"""
+import io
+import time
+import pydicom
+from benchmarks.datasets import make_dicom_bytes
+from dicom_header import read_dicom_header
+
+
+def measure(func, data, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(io.BytesIO(data))
+    return (time.perf_counter() - start) / repeats
+
+
+def main(repeats=200):
+    for rows, columns in [(512, 512), (3000, 3000)]:
+        data = make_dicom_bytes(rows, columns, Modality="CT", BodyPartExamined="CHEST")
+        header = measure(read_dicom_header, data, repeats)
+        full = measure(lambda f: pydicom.dcmread(f).pixel_array, data, max(repeats // 20, 1))
+        print(f"{rows}x{columns}: header {header * 1e6:8.1f} us   full decode {full * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
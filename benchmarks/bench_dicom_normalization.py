@@ -0,0 +1,52 @@
+"""Time and peak memory of DICOM intensity normalization, legacy vs LUT engine.
+
+Run from the repository root:  python -m benchmarks.bench_dicom_normalization
+"""
+import time
+import tracemalloc
+import numpy as np
+from dicom_pixels import normalize_pixels
+
+
+def legacy_normalize(pixel_array):
+    """The original process_dicom expression, kept for comparison."""
+    if pixel_array.max() > 255:
+        pixel_array = ((pixel_array - pixel_array.min()) /
+                       (pixel_array.max() - pixel_array.min()) * 255).astype(np.uint8)
+    return pixel_array
+
+
+def measure(func, pixel_array, repeats):
+    tracemalloc.start()
+    func(pixel_array)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(pixel_array)
+    return (time.perf_counter() - start) / repeats, peak
+
+
+def main(repeats=10):
+    rng = np.random.default_rng(0)
+    cases = {
+        "CT 512x512 int16 (HU, slope 1 / intercept -1024)": (
+            rng.integers(0, 4095, size=(512, 512)).astype(np.int16), 1.0, -1024.0),
+        "DR 3000x3000 uint16 12-bit": (
+            rng.integers(0, 4095, size=(3000, 3000)).astype(np.uint16), 1.0, 0.0),
+    }
+    out = {}
+    for label, (pixels, slope, intercept) in cases.items():
+        buffer = out.setdefault(pixels.shape, np.empty(pixels.shape, dtype=np.uint8))
+        print(label)
+        for name, func in [
+            ("legacy", legacy_normalize),
+            ("engine", lambda p: normalize_pixels(p, slope, intercept, out=buffer)),
+        ]:
+            elapsed, peak = measure(func, pixels, repeats)
+            print(f"  {name:7s} {elapsed * 1e3:8.2f} ms  peak {peak / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Series ingestion for a 300-slice CT: serial vs thread-pool stacking, MPR and MIP.
+
+Run from the repository root:  python -m benchmarks.bench_dicom_series
+"""
+import os
+import random
+import time
+from pydicom.uid import generate_uid
+from benchmarks.datasets import FakeUpload, make_dicom_bytes
+from dicom_series import PLANES, load_series
+
+
+def make_series(slices=300, rows=512, columns=512):
+    series_uid = generate_uid()
+    uploads = [
+        FakeUpload(make_dicom_bytes(
+            rows, columns, signed=True, intercept=-1024.0, seed=index,
+            SeriesInstanceUID=series_uid,
+            InstanceNumber=index + 1,
+            ImagePositionPatient=[0.0, 0.0, index * 1.25],
+            ImageOrientationPatient=[1.0, 0.0, 0.0, 0.0, 1.0, 0.0],
+            PixelSpacing=[0.7, 0.7],
+            SliceThickness=1.25,
+        ), f"slice{index:04d}.dcm")
+        for index in range(slices)
+    ]
+    # Uploads arrive in arbitrary order
+    random.Random(0).shuffle(uploads)
+    return uploads
+
+
+def main():
+    uploads = make_series()
+    print(f"{len(uploads)} slices, {sum(len(u.getvalue()) for u in uploads) / 1e6:.0f} MB")
+    for workers in (1, os.cpu_count()):
+        start = time.perf_counter()
+        (volume,) = load_series(uploads, max_workers=workers)
+        print(f"  load_series workers={workers:<3d} {time.perf_counter() - start:6.2f} s")
+
+    for plane in PLANES:
+        start = time.perf_counter()
+        volume.render(plane)
+        mpr = time.perf_counter() - start
+        start = time.perf_counter()
+        volume.render(plane, mip=True)
+        mip = time.perf_counter() - start
+        print(f"  {plane:9s} MPR {mpr * 1e3:7.2f} ms   MIP {mip * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
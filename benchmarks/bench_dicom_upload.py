@@ -0,0 +1,57 @@
+"""Per-upload DICOM latency and bytes written: temp-file route vs in-memory route.
+
+Run from the repository root:  python -m benchmarks.bench_dicom_upload
+"""
+import time
+from benchmarks.datasets import FakeUpload, make_dicom_bytes
+from image_processing import decode_dicom, dicom_buffer, render_dicom
+from temp_artifacts import temp_artifact
+
+
+def decode_dicom_via_temp_file(upload):
+    """The app's former route: write the upload to a temp file and parse that."""
+    with temp_artifact(".dcm") as temp_path:
+        with open(temp_path, "wb") as f:
+            f.write(upload.getbuffer())
+        return decode_dicom(temp_path)
+
+
+def bytes_written():
+    """Bytes this process has passed to write() so far (Linux only)."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def measure(route, data, repeats):
+    start_bytes = bytes_written()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        route(FakeUpload(data, "study.dcm"))
+    elapsed = (time.perf_counter() - start) / repeats
+    end_bytes = bytes_written()
+    written = None if start_bytes is None else (end_bytes - start_bytes) / repeats
+    return elapsed, written
+
+
+def main(repeats=50):
+    routes = {
+        "temp file": lambda upload: render_dicom(decode_dicom_via_temp_file(upload)),
+        "in-memory": lambda upload: render_dicom(decode_dicom(dicom_buffer(upload))),
+    }
+    for rows, columns in [(512, 512), (2048, 2048)]:
+        data = make_dicom_bytes(rows, columns)
+        print(f"{rows}x{columns} ({len(data) / 1e6:.1f} MB)")
+        for label, route in routes.items():
+            elapsed, written = measure(route, data, repeats)
+            written_text = "n/a" if written is None else f"{written / 1e6:.2f} MB"
+            print(f"  {label:10s} {elapsed * 1e3:8.2f} ms/upload  written {written_text}/upload")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Crafted oversized inputs: each is rejected or downsampled before its pixels are allocated.
+
+Every case is a small file whose headers claim a huge image (or a real
+image over the pixel budget) and runs through the app's decode path in a
+fresh process. The script reports the outcome, time and peak RSS growth
+of each, and exits non-zero when an input isn't handled as expected.
+
+Run from the repository root:  python -m benchmarks.bench_guardrails
+"""
+import math
+import os
+import struct
+import sys
+import tempfile
+import zipfile
+import zlib
+from PIL import Image
+from benchmarks.bench_tiff import measure
+from benchmarks.datasets import make_dicom_bytes, write_ifd, write_tiff
+from dicom_series import load_series
+from image_processing import load_local_file, process_uploaded_file
+from upload_limits import MAX_FRAMES, MAX_IMAGE_PIXELS, MAX_UPLOAD_BYTES
+
+
+def png_header(width, height):
+    """A PNG whose IHDR claims ``width`` x ``height``, with no real pixel data."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr)
+            + chunk(b"IDAT", zlib.compress(b"")) + chunk(b"IEND", b""))
+
+
+def write_bomb_tiff(path, width, height, tile=None):
+    """A TIFF whose every strip or tile is the same Deflate stream of 64 MB of zeros."""
+    payload = zlib.compress(bytes(64 << 20), 9)
+    with open(path, "wb") as f:
+        f.write(b"II" + struct.pack("<HI", 42, 0))
+        offset = f.tell()
+        f.write(payload)
+        tags = [(256, "I", [width]), (257, "I", [height]), (258, "H", [8]),
+                (259, "H", [8]), (262, "H", [1]), (277, "H", [1])]
+        if tile:
+            count = math.ceil(width / tile) * math.ceil(height / tile)
+            tags += [(322, "H", [tile]), (323, "H", [tile]),
+                     (324, "I", [offset] * count), (325, "I", [len(payload)] * count)]
+        else:
+            tags += [(273, "I", [offset]), (278, "I", [height]), (279, "I", [len(payload)])]
+        ifd_offset, _ = write_ifd(f, tags, False)
+        f.seek(4)
+        f.write(struct.pack("<I", ifd_offset))
+
+
+def write_zip(path, members):
+    """Zip of (name, size) members filled with zeros, written in pieces."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, size in members:
+            with archive.open(name, "w", force_zip64=True) as member:
+                for start in range(0, size, 16 << 20):
+                    member.write(bytes(min(16 << 20, size - start)))
+
+
+def process_upload(path, page):
+    return process_uploaded_file(load_local_file(path)).size
+
+
+def stack_series(path, page):
+    return len(load_series([load_local_file(path)]))
+
+
+def write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def cases(directory):
+    """(label, scenario, path, expected outcome) of every crafted input."""
+    def path(name):
+        return os.path.join(directory, name)
+
+    side = math.isqrt(MAX_IMAGE_PIXELS) + 1000
+    write_file(path("claims-100000px.png"), png_header(100_000, 100_000))
+    write_file(path("over-budget.png"), png_header(side, side))
+    Image.new("L", (side, side), 128).save(path("over-budget.jpg"), quality=90)
+    write_file(path("huge-rows.dcm"), make_dicom_bytes(64, 64, Rows=60_000, Columns=60_000))
+    write_file(path("many-frames.dcm"), make_dicom_bytes(64, 64, NumberOfFrames=MAX_FRAMES + 1))
+    write_file(path("huge-volume.dcm"),
+               make_dicom_bytes(64, 64, Rows=4096, Columns=4096, NumberOfFrames=100))
+    write_bomb_tiff(path("one-huge-strip.tif"), 50_000, 50_000)
+    write_bomb_tiff(path("deflate-bomb-tiles.tif"), 4096, 4096, tile=512)
+    write_tiff(path("many-pages.tif"), [(1, 1)] * (MAX_FRAMES + 1), tile=None)
+    write_zip(path("many-members.zip"), [(f"slice-{i}.dcm", 1) for i in range(MAX_FRAMES + 1)])
+    write_zip(path("zip-bomb.zip"), [("slice.dcm", MAX_UPLOAD_BYTES + (1 << 20))])
+    return [
+        ("PNG header claiming 100000x100000", process_upload, path("claims-100000px.png"), "rejected"),
+        (f"PNG {side}x{side}, over pixel budget", process_upload, path("over-budget.png"), "rejected"),
+        (f"JPEG {side}x{side}, over pixel budget", process_upload, path("over-budget.jpg"), "decoded"),
+        ("DICOM claiming 60000x60000", process_upload, path("huge-rows.dcm"), "rejected"),
+        (f"DICOM claiming {MAX_FRAMES + 1} frames", process_upload, path("many-frames.dcm"), "rejected"),
+        ("DICOM claiming 100 x 4096x4096", process_upload, path("huge-volume.dcm"), "rejected"),
+        ("TIFF 50000x50000 in one strip", process_upload, path("one-huge-strip.tif"), "rejected"),
+        ("TIFF with Deflate-bomb tiles", process_upload, path("deflate-bomb-tiles.tif"), "decoded"),
+        (f"TIFF with {MAX_FRAMES + 1} pages", process_upload, path("many-pages.tif"), "rejected"),
+        (f"zip of {MAX_FRAMES + 1} slices", stack_series, path("many-members.zip"), "rejected"),
+        ("zip bomb", stack_series, path("zip-bomb.zip"), "rejected"),
+    ]
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for label, scenario, path, expected in cases(directory):
+            elapsed, memory, error = measure(scenario, path, 0)
+            if error is None:
+                outcome = "decoded"
+            elif error.startswith("UploadRejected"):
+                outcome = "rejected"
+            else:
+                outcome = "failed"
+            ok = outcome == expected
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {label:38s} {outcome:9s} "
+                  f"{elapsed * 1e3:8.1f} ms  peak RSS +{memory / 1e6:6.1f} MB")
+            if error:
+                print(f"       {error}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""JPEG uploads: full decode then resize vs DCT-domain draft decode at the nearest 1/2-1/8 scale.
+
+Generates radiograph-like grayscale and RGB JPEGs from 3000 to 9000 px.
+Both routes produce the display thumbnail and the analysis image; each
+runs in a fresh process so peak RSS is measured on its own, and the
+analysis images of the two routes are compared.
+
+Run from the repository root:  python -m benchmarks.bench_jpeg_draft
+"""
+import os
+import tempfile
+import numpy as np
+from PIL import Image
+from benchmarks.bench_tiff import measure
+from image_previews import downscale, side_fit, width_fit
+from image_processing import load_local_file, process_uploaded_file
+
+SIDES = (3000, 6000, 9000)
+
+
+def radiograph(side, mode, seed=0):
+    """Chest-film-like test image: soft body outline, rib-like bands and film grain."""
+    rng = np.random.default_rng(seed)
+    xs = (np.arange(side, dtype=np.float32) / side)[None, :]
+    pixels = np.empty((side, side), dtype=np.uint8)
+    # Generated in bands so large sides don't need several full-size float arrays
+    for top in range(0, side, 1024):
+        ys = (np.arange(top, min(top + 1024, side), dtype=np.float32) / side)[:, None]
+        body = np.exp(-(((xs - 0.5) / 0.35) ** 2 + ((ys - 0.55) / 0.45) ** 2) * 2)
+        ribs = 0.15 * np.sin(ys * 60 + np.abs(xs - 0.5) * 8) * body
+        grain = rng.normal(0, 6, body.shape).astype(np.float32)
+        pixels[top:top + len(ys)] = (body * 180 + ribs * 255 + grain).clip(0, 255)
+    image = Image.fromarray(pixels)
+    return image.convert("RGB") if mode == "RGB" else image
+
+
+def full_decode(path, page):
+    with Image.open(path) as image:
+        image.load()
+        return outputs(image)
+
+
+def draft_decode(path, page):
+    return outputs(process_uploaded_file(load_local_file(path)))
+
+
+def outputs(image):
+    """The app's two derived images: display thumbnail and analysis image."""
+    return downscale(image, width_fit(image.size)), downscale(image, side_fit(image.size))
+
+
+def difference(path):
+    """Mean and max absolute difference between the two routes' analysis images."""
+    full = np.asarray(full_decode(path, 0)[1], dtype=np.int16)
+    draft = np.asarray(draft_decode(path, 0)[1], dtype=np.int16)
+    if full.shape != draft.shape:
+        return None
+    delta = np.abs(full - draft)
+    return delta.mean(), delta.max()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("L", "RGB"):
+            for side in SIDES:
+                path = os.path.join(directory, f"radiograph-{mode}-{side}.jpg")
+                radiograph(side, mode).save(path, quality=92)
+                size = os.path.getsize(path) / 1e6
+                results = {
+                    label: measure(route, path, 0)
+                    for label, route in (("full", full_decode), ("draft", draft_decode))
+                }
+                line = [f"{mode:3s} {side}x{side} ({size:4.1f} MB)"]
+                for label, (elapsed, memory, error) in results.items():
+                    if error:
+                        line.append(f"{label} failed: {error}")
+                    else:
+                        line.append(f"{label} {elapsed * 1e3:7.1f} ms +{memory / 1e6:6.1f} MB")
+                delta = difference(path)
+                if delta:
+                    line.append(f"analysis image diff mean {delta[0]:.2f} max {delta[1]}")
+                print("   ".join(line))
+
+
+if __name__ == "__main__":
+    main()
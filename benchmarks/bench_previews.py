@@ -0,0 +1,37 @@
+"""Preview downscaling on 4k-10k inputs: full-resolution resize vs reduce + resample.
+
+Run from the repository root:  python -m benchmarks.bench_previews
+"""
+import time
+import numpy as np
+from PIL import Image
+from image_previews import analysis_image, display_preview, downscale, side_fit, width_fit
+
+
+def timed(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+
+def main(repeats=3):
+    rng = np.random.default_rng(0)
+    for side in (4000, 7000, 10000):
+        image = Image.fromarray(rng.integers(0, 255, size=(side, side), dtype=np.uint8))
+        target = width_fit(image.size)
+        legacy = timed(lambda: image.resize(target), repeats)
+        reduced = timed(lambda: downscale(image, target), repeats)
+        analysis = timed(lambda: downscale(image, side_fit(image.size)), repeats)
+        key = ("bench", side)
+        display_preview(key, lambda: image)
+        analysis_image(key, lambda: image)
+        cached = timed(lambda: (display_preview(key, lambda: image),
+                                analysis_image(key, lambda: image)), 100)
+        print(f"{side}x{side}: legacy resize {legacy * 1e3:8.1f} ms   "
+              f"reduce+lanczos {reduced * 1e3:7.1f} ms   "
+              f"analysis {analysis * 1e3:7.1f} ms   cached {cached * 1e6:6.1f} us")
+
+
+if __name__ == "__main__":
+    main()
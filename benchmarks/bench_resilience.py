@@ -0,0 +1,267 @@
+"""Retry, timeout, hedging and circuit-breaker behaviour against a local stub server.
+
+The stub answers over HTTP on localhost with a long-tailed latency
+distribution and a configurable share of 503 responses, so the policies
+in resilience.py are exercised end to end without touching real services.
+Each scenario is checked against the outcome its policy should give, and
+the script exits non-zero when one isn't met.
+
+Run from the repository root:  python -m benchmarks.bench_resilience
+"""
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from resilience import (
+    BREAKERS,
+    CALL_WORKERS,
+    LATENCIES,
+    CircuitBreaker,
+    CircuitOpen,
+    LatencyTracker,
+    RetryPolicy,
+    call_with_policy,
+    check_abandoned,
+    is_retryable,
+    stream_with_policy,
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Set per scenario: (median seconds, slow-call share, slow seconds, failure share)
+    behaviour = (0.02, 0.05, 1.0, 0.0)
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+
+    def do_GET(self):
+        median, slow_share, slow, failure_share = self.behaviour
+        with self.rng_lock:
+            delay = slow if self.rng.random() < slow_share else self.rng.expovariate(1 / median)
+            failed = self.rng.random() < failure_share
+        time.sleep(delay)
+        body = b"unavailable" if failed else b"ok"
+        self.send_response(503 if failed else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch(url):
+    # HTTPError carries the status code is_retryable looks at
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.read()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else float("inf")
+
+
+def scenario(label, url, policy, calls=200):
+    """Success rate and p95/p99 latency of ``calls`` sequential guarded calls."""
+    BREAKERS["stub"] = CircuitBreaker("Stub", failure_threshold=calls + 1)
+    LATENCIES["stub"] = LatencyTracker()
+    latencies, failures = [], 0
+    for _ in range(calls):
+        start = time.perf_counter()
+        try:
+            call_with_policy(lambda: fetch(url), policy, "stub")
+        except Exception:
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    success, p95, p99 = 1 - failures / calls, percentile(latencies, 0.95), percentile(latencies, 0.99)
+    print(
+        f"     {label:28s} success {success:6.1%}  "
+        f"p50 {percentile(latencies, 0.5) * 1e3:7.1f} ms  "
+        f"p95 {p95 * 1e3:7.1f} ms  p99 {p99 * 1e3:7.1f} ms"
+    )
+    return success, p95, p99
+
+
+def breaker_scenario(url):
+    """Against a hard-down service, count how many calls reach it."""
+    StubHandler.behaviour = (0.01, 0.0, 0.0, 1.0)
+    BREAKERS["stub"] = CircuitBreaker("Stub", failure_threshold=5, reset_seconds=0.5)
+    LATENCIES["stub"] = LatencyTracker()
+    policy = RetryPolicy(timeout=1.0, attempts=1)
+    sent = fast_failed = 0
+    for _ in range(50):
+        try:
+            call_with_policy(lambda: fetch(url), policy, "stub")
+        except CircuitOpen:
+            fast_failed += 1
+        except Exception:
+            sent += 1
+    time.sleep(0.6)
+    StubHandler.behaviour = (0.01, 0.0, 0.0, 0.0)
+    call_with_policy(lambda: fetch(url), policy, "stub")
+    state = BREAKERS["stub"].state
+    print(f"     service down, 50 calls: {sent} reached the stub, {fast_failed} failed fast; "
+          f"after recovery the breaker is {state}")
+    return sent, fast_failed, state
+
+
+def nested_scenario(url):
+    """Model calls that each make a web search, more of them at once than there are workers."""
+    policy = RetryPolicy(timeout=5.0, attempts=1)
+    StubHandler.behaviour = (0.2, 0.0, 0.0, 0.0)
+    results = []
+
+    def model_call():
+        return call_with_policy(lambda: fetch(url), policy, "duckduckgo")
+
+    def run():
+        try:
+            results.append(call_with_policy(model_call, policy, "model"))
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(2 * CALL_WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    completed = sum(result == b"ok" for result in results)
+    print(f"     {len(threads)} concurrent model calls with nested searches: {completed} completed")
+    return completed, len(threads)
+
+
+def abandoned_stream_scenario():
+    """A stream the caller stops reading after three chunks is closed by its reader thread."""
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                time.sleep(0.01)
+                yield "chunk"
+        finally:
+            closed.set()
+
+    BREAKERS["stub"] = CircuitBreaker("Stub")
+    stream = stream_with_policy(endless, RetryPolicy(timeout=1.0, attempts=1), "stub")
+    for _, _ in zip(range(3), stream):
+        pass
+    stream.close()
+    return closed.wait(1.0)
+
+
+def abandoned_worker_scenario():
+    """A call that times out while waiting for its slot never reaches the service."""
+    reached = []
+
+    def call():
+        time.sleep(0.5)  # Waiting for a dispatcher slot
+        check_abandoned()
+        reached.append(True)
+
+    BREAKERS["stub"] = CircuitBreaker("Stub")
+    try:
+        call_with_policy(call, RetryPolicy(timeout=0.2, attempts=1), "stub")
+    except TimeoutError:
+        pass
+    time.sleep(0.6)
+    return not reached
+
+
+def hedged_deadline_scenario():
+    """The deadline counts from the original call even when it fails while its hedge runs."""
+    BREAKERS["stub"] = CircuitBreaker("Stub")
+    LATENCIES["stub"] = LatencyTracker()
+    for _ in range(20):
+        LATENCIES["stub"].add(0.5)
+    calls = []
+
+    def call():
+        calls.append(True)
+        if len(calls) == 1:
+            # The original fails after its hedge (at the 0.5 s p95) has started
+            time.sleep(0.8)
+            raise ConnectionError("reset")
+        time.sleep(3.0)
+
+    start = time.perf_counter()
+    try:
+        call_with_policy(call, RetryPolicy(timeout=1.0, attempts=1, hedge=True), "stub")
+    except TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"     hedged call whose original fails: gave up after {elapsed:.2f} s (timeout 1 s)")
+    return elapsed < 1.25
+
+
+def classification():
+    """is_retryable on statuses and exception types, not on digits in the message."""
+    def http_error(code):
+        return urllib.error.HTTPError("http://stub/", code, "stub", {}, None)
+
+    cases = [
+        (http_error(503), True),
+        (http_error(429), True),
+        (http_error(400), False),
+        (ConnectionError("connection reset"), True),
+        (TimeoutError(), True),
+        (RuntimeError("429 Resource has been exhausted"), True),
+        (ValueError("expected 500 rows, got 499"), False),
+        (KeyError("HTTP_503_HANDLER"), False),
+    ]
+    return [(f"{type(error).__name__}({error}) retryable={expected}", is_retryable(error) == expected)
+            for error, expected in cases]
+
+
+def main():
+    server = start_stub()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    checks = classification()
+
+    StubHandler.behaviour = (0.02, 0.05, 1.0, 0.0)
+    _, plain_p95, _ = scenario("tail latency, plain", url, RetryPolicy(timeout=5.0, attempts=1))
+    _, hedged_p95, _ = scenario("tail latency, hedged p95", url,
+                                RetryPolicy(timeout=5.0, attempts=1, hedge=True))
+    checks.append(("hedging halves p95 latency", hedged_p95 < plain_p95 / 2))
+
+    StubHandler.behaviour = (0.02, 0.0, 0.0, 0.2)
+    single, _, _ = scenario("20% failures, no retry", url, RetryPolicy(timeout=5.0, attempts=1))
+    retried, _, _ = scenario("20% failures, 3 attempts", url,
+                             RetryPolicy(timeout=5.0, attempts=3, backoff=0.01))
+    checks.append(("retries recover 503s", retried >= 0.97 and retried > single))
+
+    StubHandler.behaviour = (0.02, 0.1, 3.0, 0.0)
+    scenario("10% hangs, no timeout", url, RetryPolicy(timeout=10.0, attempts=1), calls=50)
+    success, _, p99 = scenario("10% hangs, 0.5s timeout", url,
+                               RetryPolicy(timeout=0.5, attempts=3, backoff=0.01), calls=50)
+    checks.append(("timeouts cut off hangs", success >= 0.95 and p99 < 2.0))
+
+    sent, fast_failed, state = breaker_scenario(url)
+    checks.append(("breaker opens after 5 failures", (sent, fast_failed) == (5, 45)))
+    checks.append(("breaker closes after recovery", state == "closed"))
+
+    completed, total = nested_scenario(url)
+    checks.append(("nested searches don't starve", completed == total))
+    checks.append(("abandoned stream is closed", abandoned_stream_scenario()))
+    checks.append(("abandoned worker skips the service", abandoned_worker_scenario()))
+    checks.append(("deadline counts from the original call", hedged_deadline_scenario()))
+    server.shutdown()
+
+    failures = 0
+    for label, ok in checks:
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {label}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
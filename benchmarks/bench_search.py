@@ -0,0 +1,47 @@
+"""Research-phase search time: serial uncached searches vs the cached, parallel layer.
+
+Uses the fake DuckDuckGo tool (no network), with its default latency
+distribution unless FAKE_SERVICES overrides it.
+
+Run from the repository root:  python -m benchmarks.bench_search
+"""
+import time
+from fake_services import FakeDuckDuckGo, FakeSearch
+from search_layer import SEARCH_CACHE, SEARCH_METRICS
+
+# What a report's research section typically looks for, with the case and
+# punctuation variants that similar findings produce
+QUERIES = [
+    "community acquired pneumonia treatment guidelines",
+    "Community-acquired pneumonia: treatment guidelines",
+    "right lower lobe consolidation differential diagnosis",
+    "chest x-ray consolidation differential diagnosis right lower lobe",
+    "pleural effusion management protocol",
+]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main(reports=3):
+    raw = FakeSearch()
+    layered = FakeDuckDuckGo()
+    serial = sum(
+        timed(lambda: [raw.duckduckgo_search(query) for query in QUERIES]) for _ in range(reports)
+    )
+    SEARCH_CACHE.clear()
+    parallel = [timed(lambda: layered.duckduckgo_search_many(QUERIES)) for _ in range(reports)]
+    stats = SEARCH_METRICS.stats()
+    print(f"{reports} reports x {len(QUERIES)} queries")
+    print(f"serial, uncached     {serial:6.2f} s")
+    print(f"parallel, first run  {parallel[0]:6.2f} s")
+    print(f"parallel, repeats    {sum(parallel[1:]):6.2f} s")
+    print(f"{stats['queries']} lookups, {stats['cached']} from cache, "
+          f"live p50 {stats['p50']:.2f} s p95 {stats['p95']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Whole-slide pyramid reads: level-of-detail selection vs reading full resolution.
+
+Generates SVS-style pyramidal BigTIFFs (512 px JPEG tiles, levels at
+1/4 and 1/16), once with YCbCr tiles (photometric 6) and once with RGB
+tiles (photometric 2, as Aperio writes them), and measures time and peak
+RSS of each read in a fresh process.
+
+Run from the repository root:  python -m benchmarks.bench_slide [--width 40000 --height 30000]
+"""
+import argparse
+import os
+import tempfile
+from PIL import Image
+from benchmarks.bench_tiff import measure
+from benchmarks.datasets import write_tiff
+from image_previews import ANALYSIS_MAX_SIDE
+from slide_pyramid import SlidePyramid
+from tiff_pages import TiffPages
+
+
+def pillow_base(path, page):
+    Image.MAX_IMAGE_PIXELS = None
+    with Image.open(path) as image:
+        image.load()
+        return image.size
+
+
+def strided_base(path, page):
+    return TiffPages.open(path).render(0, max_side=ANALYSIS_MAX_SIDE).size
+
+
+def pyramid_overview(path, page):
+    return SlidePyramid(TiffPages.open(path)).overview().size
+
+
+def native_region(path, page):
+    slide = SlidePyramid(TiffPages.open(path))
+    return slide.roi(slide.width // 2, slide.height // 2, 1024)[1].size
+
+
+def wide_region(path, page):
+    slide = SlidePyramid(TiffPages.open(path))
+    return slide.roi(slide.width // 3, slide.height // 3, 8192)[1].size
+
+
+# Tile encodings of the generated slides, by write_tiff compression
+ENCODINGS = {"YCbCr JPEG": "jpeg", "RGB JPEG": "jpeg-rgb"}
+
+SCENARIOS = {
+    "Pillow, full resolution": pillow_base,
+    "level 0, strided preview": strided_base,
+    "pyramid overview": pyramid_overview,
+    "1024px region, native": native_region,
+    "8192px region, LOD": wide_region,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=40000)
+    parser.add_argument("--height", type=int, default=30000)
+    parser.add_argument("--skip-pillow", action="store_true",
+                        help="Pillow decodes the whole base level; needs width x height x 3 bytes of RAM")
+    args = parser.parse_args(argv)
+
+    width, height = args.width, args.height
+    sizes = [(width, height), (width // 4, height // 4), (width // 16, height // 16)]
+    with tempfile.TemporaryDirectory() as directory:
+        for encoding, compression in ENCODINGS.items():
+            path = os.path.join(directory, f"slide-{compression}.tif")
+            write_tiff(path, sizes, tile=512, compression=compression, samples=3, bigtiff=True)
+            print(f"{width}x{height} slide, {encoding} tiles, {len(sizes)} levels, "
+                  f"{os.path.getsize(path) / 1e6:.0f} MB on disk")
+            for name, scenario in SCENARIOS.items():
+                if args.skip_pillow and scenario is pillow_base:
+                    continue
+                elapsed, memory, error = measure(scenario, path, 0)
+                if error:
+                    print(f"  {name:26s} failed: {error}")
+                else:
+                    print(f"  {name:26s} {elapsed * 1e3:9.1f} ms  peak RSS +{memory / 1e6:7.1f} MB")
+            # Free the disk space before the next slide is written
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Format detection by content: sniffing cost and dispatch of misnamed and extensionless files.
+
+Every input goes through process_uploaded_file under a name that doesn't
+match its content (or has no extension at all), including an implicit-VR
+DICOM stream without preamble as older PACS exports write it.
+
+Run from the repository root:  python -m benchmarks.bench_sniffing
+"""
+import io
+import os
+import tempfile
+import time
+import numpy as np
+import pydicom
+from PIL import Image
+from pydicom.filebase import DicomBytesIO
+from pydicom.filewriter import write_dataset
+from benchmarks.datasets import FakeUpload, make_dicom_bytes, write_tiff
+from image_processing import process_uploaded_file
+from upload_formats import sniff_upload
+
+
+def raw_dicom_bytes(rows=512, columns=512):
+    """Implicit VR little endian dataset with no preamble, "DICM" prefix or file meta."""
+    ds = pydicom.dcmread(io.BytesIO(make_dicom_bytes(rows, columns)))
+    ds.is_implicit_VR = True
+    buffer = DicomBytesIO()
+    buffer.is_little_endian = True
+    buffer.is_implicit_VR = True
+    write_dataset(buffer, ds)
+    return buffer.getvalue()
+
+
+def encoded(image, image_format):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def tiff_bytes():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "slide.tif")
+        write_tiff(path, [(2048, 2048)], tile=256, compression="deflate")
+        with open(path, "rb") as f:
+            return f.read()
+
+
+def main(repeats=1000):
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 255, (1024, 1024), dtype=np.uint8))
+    inputs = [
+        ("DICOM, no extension", make_dicom_bytes(), "1.2.840.113619.2.55.3"),
+        ("raw implicit-VR DICOM", raw_dicom_bytes(), "IM000001"),
+        ("PNG named .dcm", encoded(image, "PNG"), "scan.dcm"),
+        ("JPEG named .png", encoded(image, "JPEG"), "photo.png"),
+        ("TIFF named .jpg", tiff_bytes(), "slide.jpg"),
+        ("text named .dcm", b"Patient export log\n" * 100, "readme.dcm"),
+    ]
+    for label, data, name in inputs:
+        upload = FakeUpload(data, name)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            file_format = sniff_upload(upload)
+        sniff_seconds = (time.perf_counter() - start) / repeats
+        start = time.perf_counter()
+        try:
+            result = "decoded {}x{}".format(*process_uploaded_file(upload).size)
+        except Exception as e:
+            result = f"rejected: {e}"
+        decode_seconds = time.perf_counter() - start
+        print(f"{label:24s} -> {str(file_format):6s} sniff {sniff_seconds * 1e6:5.1f} us  "
+              f"{decode_seconds * 1e3:7.1f} ms  {result}")
+
+
+if __name__ == "__main__":
+    main()
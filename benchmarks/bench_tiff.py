@@ -0,0 +1,104 @@
+"""Latency and peak memory of opening large multi-page TIFFs: Pillow vs lazy tile access.
+
+Generates multi-hundred-MB TIFFs (tiled uncompressed, striped Deflate,
+tiled JPEG and tiled RGB-photometric JPEG) in a temp directory. Each scenario runs in a fresh process so
+its peak RSS is measured on its own.
+
+Run from the repository root:  python -m benchmarks.bench_tiff [--side 12000] [--pages 3]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from PIL import Image
+from benchmarks.datasets import write_tiff
+from image_previews import ANALYSIS_MAX_SIDE
+from tiff_pages import TiffPages
+
+LAYOUTS = {
+    "tiled, uncompressed": {"tile": 512, "compression": "none"},
+    "striped, Deflate": {"tile": None, "rows_per_strip": 64, "compression": "deflate"},
+    "tiled, JPEG": {"tile": 512, "compression": "jpeg"},
+    "tiled, RGB JPEG": {"tile": 512, "compression": "jpeg-rgb", "samples": 3},
+}
+
+
+def pillow_page(path, page):
+    image = Image.open(path)
+    image.seek(page)
+    image.load()
+    return image.size
+
+
+def lazy_preview(path, page):
+    return TiffPages.open(path).render(page, max_side=ANALYSIS_MAX_SIDE).size
+
+
+def lazy_region(path, page):
+    tiff = TiffPages.open(path)
+    width, height = tiff.pages[page].width, tiff.pages[page].height
+    return tiff.render(page, region=(width // 2, height // 2, 1024, 1024)).size
+
+
+def lazy_pages(path, page):
+    return [page.label() for page in TiffPages.open(path).pages]
+
+
+SCENARIOS = {
+    "Pillow, whole page": pillow_page,
+    "lazy, page preview": lazy_preview,
+    "lazy, 1024px region": lazy_region,
+    "lazy, list pages": lazy_pages,
+}
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes (ru_maxrss is KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_scenario(scenario, path, page, results):
+    baseline = peak_rss()
+    start = time.perf_counter()
+    error = None
+    try:
+        scenario(path, page)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    results.put((time.perf_counter() - start, peak_rss() - baseline, error))
+
+
+def measure(scenario, path, page):
+    """(seconds, peak RSS growth, error) of ``scenario(path, page)`` run in a fresh process."""
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_scenario, args=(scenario, path, page, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--side", type=int, default=12000, help="Page side in pixels")
+    parser.add_argument("--pages", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for layout, options in LAYOUTS.items():
+            path = os.path.join(directory, "study.tif")
+            write_tiff(path, [(args.side, args.side)] * args.pages, **options)
+            print(f"{layout}: {args.pages} pages of {args.side}x{args.side}, "
+                  f"{os.path.getsize(path) / 1e6:.0f} MB on disk")
+            for name, scenario in SCENARIOS.items():
+                elapsed, memory, error = measure(scenario, path, args.pages - 1)
+                if error:
+                    print(f"  {name:22s} failed: {error}")
+                else:
+                    print(f"  {name:22s} {elapsed * 1e3:9.1f} ms  peak RSS +{memory / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Locally generated inputs shared by the benchmark scripts."""
+import io
+import struct
+import zlib
+import numpy as np
+from PIL import Image
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, SecondaryCaptureImageStorage, generate_uid
+
+
+class FakeUpload(io.BytesIO):
+    """Minimal stand-in for Streamlit's UploadedFile (a named BytesIO)."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def make_dicom_bytes(rows=512, columns=512, bits_stored=12, signed=False,
+                     slope=1.0, intercept=0.0, seed=0, **attributes):
+    """Build an uncompressed single-frame monochrome DICOM in memory.
+
+    Extra keyword arguments are set as DICOM attributes by keyword.
+    """
+    rng = np.random.default_rng(seed)
+    if signed:
+        low, high = -(1 << (bits_stored - 1)), (1 << (bits_stored - 1)) - 1
+        dtype = np.int16
+    else:
+        low, high = 0, (1 << bits_stored) - 1
+        dtype = np.uint16 if bits_stored > 8 else np.uint8
+    pixels = rng.integers(low, high, size=(rows, columns), endpoint=True).astype(dtype)
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = SecondaryCaptureImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.is_little_endian = True
+    ds.is_implicit_VR = False
+    ds.SOPClassUID = meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.Modality = "OT"
+    ds.Rows = rows
+    ds.Columns = columns
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.BitsAllocated = pixels.dtype.itemsize * 8
+    ds.BitsStored = bits_stored
+    ds.HighBit = bits_stored - 1
+    ds.PixelRepresentation = 1 if signed else 0
+    ds.RescaleSlope = slope
+    ds.RescaleIntercept = intercept
+    ds.PixelData = pixels.tobytes()
+    for keyword, value in attributes.items():
+        setattr(ds, keyword, value)
+
+    buffer = io.BytesIO()
+    ds.save_as(buffer, write_like_original=False)
+    return buffer.getvalue()
+
+
+# TIFF field types used by write_tiff, by struct format character
+TIFF_FIELD_TYPES = {"s": 2, "H": 3, "I": 4, "Q": 16}
+# "jpeg-rgb" stores RGB samples without YCbCr conversion (photometric 2), as Aperio SVS
+# does; Pillow before 10.2 ignores keep_rgb and writes YCbCr streams under the same tag
+TIFF_COMPRESSION = {"none": 1, "jpeg": 7, "jpeg-rgb": 7, "deflate": 8}
+
+
+def tiff_chunk_pixels(left, top, width, height, samples, factor, rng):
+    """Synthetic tissue-like pattern; ``factor`` maps to full-resolution coordinates."""
+    ys = (np.arange(top, top + height) * factor)[:, None]
+    xs = (np.arange(left, left + width) * factor)[None, :]
+    base = ((xs // 2048 + ys // 2048) % 2) * 80 + (xs % 4096) // 32 + (ys % 4096) // 64
+    pixels = base + rng.integers(0, 24, size=(height, width))
+    if samples == 3:
+        pixels = np.stack([pixels, pixels // 2 + 60, 255 - pixels], axis=-1)
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+
+def encode_tiff_chunk(pixels, compression):
+    if compression == "deflate":
+        return zlib.compress(pixels.tobytes(), 1)
+    if compression in ("jpeg", "jpeg-rgb"):
+        buffer = io.BytesIO()
+        Image.fromarray(pixels.squeeze()).save(
+            buffer, format="JPEG", quality=85, keep_rgb=compression == "jpeg-rgb"
+        )
+        return buffer.getvalue()
+    return pixels.tobytes()
+
+
+def write_ifd(f, tags, bigtiff):
+    """Write one IFD (values that don't fit inline first); returns (IFD offset, next-IFD pointer)."""
+    offset_format, count_format, inline = ("Q", "Q", 8) if bigtiff else ("I", "H", 4)
+    encoded = []
+    for tag, code, values in sorted(tags):
+        raw = values if code == "s" else struct.pack(f"<{len(values)}{code}", *values)
+        value = raw.ljust(inline, b"\0")
+        if len(raw) > inline:
+            f.write(b"\0" * (f.tell() % 2))
+            value = struct.pack("<" + offset_format, f.tell())
+            f.write(raw)
+        encoded.append((tag, TIFF_FIELD_TYPES[code], len(values), value))
+    f.write(b"\0" * (f.tell() % 2))
+    ifd_offset = f.tell()
+    f.write(struct.pack("<" + count_format, len(encoded)))
+    for tag, field_type, count, value in encoded:
+        f.write(struct.pack(f"<HH{offset_format}", tag, field_type, count) + value)
+    next_pointer = f.tell()
+    f.write(struct.pack("<" + offset_format, 0))
+    return ifd_offset, next_pointer
+
+
+def write_tiff(path, sizes, tile=256, rows_per_strip=64, compression="none", samples=1,
+               bigtiff=False, seed=0, subfile_types=None):
+    """Write a TIFF with one page per (width, height) in ``sizes``, chunk by chunk.
+
+    Pages are tiled (``tile`` square) or striped when ``tile`` is None, and
+    are never held in memory whole, so files of several GB can be made.
+    Each page shows the same pattern scaled to the first page's size, as
+    in a pyramid.
+    """
+    rng = np.random.default_rng(seed)
+    offset_format = "Q" if bigtiff else "I"
+    with open(path, "wb") as f:
+        if bigtiff:
+            f.write(b"II" + struct.pack("<HHHQ", 43, 8, 0, 0))
+            pointer = 8
+        else:
+            f.write(b"II" + struct.pack("<HI", 42, 0))
+            pointer = 4
+        full_width = sizes[0][0]
+        for page, (width, height) in enumerate(sizes):
+            chunk_width, chunk_height = (tile, tile) if tile else (width, min(rows_per_strip, height))
+            factor = full_width / width
+            offsets, counts = [], []
+            for top in range(0, height, chunk_height):
+                for left in range(0, width, chunk_width):
+                    # Tiles are always full size (padded); the last strip is short
+                    rows = chunk_height if tile else min(chunk_height, height - top)
+                    pixels = tiff_chunk_pixels(left, top, chunk_width, rows, samples, factor, rng)
+                    data = encode_tiff_chunk(pixels, compression)
+                    offsets.append(f.tell())
+                    counts.append(len(data))
+                    f.write(data)
+            tags = [
+                (256, "I", [width]),
+                (257, "I", [height]),
+                (258, "H", [8] * samples),
+                (259, "H", [TIFF_COMPRESSION[compression]]),
+                (262, "H", [(6 if compression == "jpeg" else 2) if samples == 3 else 1]),
+                (277, "H", [samples]),
+                (284, "H", [1]),
+            ]
+            if subfile_types:
+                tags.append((254, "I", [subfile_types[page]]))
+            if tile:
+                tags += [(322, "H", [tile]), (323, "H", [tile]),
+                         (324, offset_format, offsets), (325, offset_format, counts)]
+            else:
+                tags += [(273, offset_format, offsets), (278, "I", [chunk_height]),
+                         (279, offset_format, counts)]
+            ifd_offset, next_pointer = write_ifd(f, tags, bigtiff)
+            f.seek(pointer)
+            f.write(struct.pack("<" + offset_format, ifd_offset))
+            f.seek(0, io.SEEK_END)
+            pointer = next_pointer
@@ -0,0 +1,177 @@
+"""End-to-end load test of upload -> decode -> resize -> analyze on local fakes.
+
+Each request goes through the app's code path: the upload is decoded and
+downscaled to analysis size, written to a temp artifact, and analysed
+through the agent pool, dispatcher and retry policy. The model is the fake
+Gemini backend and search is the fake DuckDuckGo tool, so no network or
+API quota is used. Latency percentiles are reported per stage and end to
+end, along with throughput.
+
+Run from the repository root:
+    python -m benchmarks.load_test --requests 200 --concurrency 16 --kind dicom \\
+        --config '{"model": {"first_token_median": 0.5, "failure_rate": 0.05}}'
+"""
+import argparse
+import io
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from agent_factory import agent_pool
+from analysis_phases import research_when_ready, start_research
+from analysis_stream import run_text, stream_text
+from benchmarks.datasets import FakeUpload, make_dicom_bytes
+from dispatcher import ThreadedDispatcher, estimate_tokens
+from fake_services import configure_fakes, load_config
+from image_previews import downscale, side_fit
+from image_processing import process_uploaded_file
+from prompts import ANALYSIS_QUERY, VISION_QUERY
+from resilience import ANALYSIS_POLICY, call_with_policy, check_abandoned, stream_with_policy
+from temp_artifacts import temp_artifact
+
+STAGES = ("decode", "resize", "encode", "analyze", "vision", "research", "total")
+
+
+def make_uploads(kind, size, count):
+    """Distinct uploads, so no stage is served from a cache."""
+    uploads = []
+    for seed in range(count):
+        if kind == "dicom":
+            data = make_dicom_bytes(size, size, seed=seed)
+            uploads.append((data, f"study-{seed}.dcm"))
+        else:
+            rng = np.random.default_rng(seed)
+            image = Image.fromarray(rng.integers(0, 255, size=(size, size), dtype=np.uint8))
+            buffer = io.BytesIO()
+            image.save(buffer, format=kind.upper())
+            uploads.append((buffer.getvalue(), f"image-{seed}.{kind}"))
+    return uploads
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def two_phase_analysis(vision_agents, research_agents, dispatcher, image_path, timings):
+    """The app's two-phase flow: streamed findings, research started once they are ready."""
+    mark = time.perf_counter()
+    jobs = []
+    tokens = estimate_tokens(VISION_QUERY)
+
+    def vision_stream():
+        with dispatcher.slot(tokens), vision_agents.lease() as agent:
+            check_abandoned()
+            yield from stream_text(agent, VISION_QUERY, [image_path], {})
+
+    deltas = research_when_ready(
+        stream_with_policy(vision_stream, ANALYSIS_POLICY, "model"),
+        lambda findings: jobs.append(start_research(research_agents, dispatcher, findings)),
+    )
+    for _ in deltas:
+        pass
+    timings["vision"] = time.perf_counter() - mark
+    jobs[0].result()
+    timings["research"] = time.perf_counter() - mark - timings["vision"]
+
+
+def one_request(agents, dispatcher, data, name, stream, vision_agents=None):
+    timings = {}
+    start = time.perf_counter()
+    image = process_uploaded_file(FakeUpload(data, name))
+    timings["decode"] = time.perf_counter() - start
+
+    mark = time.perf_counter()
+    image = downscale(image, side_fit(image.size))
+    timings["resize"] = time.perf_counter() - mark
+
+    with temp_artifact(".png", "load-test") as image_path:
+        mark = time.perf_counter()
+        image.save(image_path, format="PNG")
+        timings["encode"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        if vision_agents is not None:
+            two_phase_analysis(vision_agents, agents, dispatcher, image_path, timings)
+            timings["analyze"] = time.perf_counter() - mark
+            timings["total"] = time.perf_counter() - start
+            return timings
+        tokens = estimate_tokens(ANALYSIS_QUERY)
+
+        def agent_run():
+            timing = {}
+            with dispatcher.slot(tokens), agents.lease() as agent:
+                check_abandoned()
+                if stream:
+                    return "".join(stream_text(agent, ANALYSIS_QUERY, [image_path], timing))
+                return run_text(agent, ANALYSIS_QUERY, [image_path], timing)
+
+        call_with_policy(agent_run, ANALYSIS_POLICY, "model")
+        timings["analyze"] = time.perf_counter() - mark
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--kind", choices=("dicom", "png", "jpeg"), default="dicom")
+    parser.add_argument("--size", type=int, default=2048, help="Image side in pixels")
+    parser.add_argument("--distinct", type=int, default=8, help="Distinct uploads to cycle through")
+    parser.add_argument("--config", help="Fake service settings, JSON or a JSON file (see fake_services)")
+    parser.add_argument("--no-search", action="store_true", help="Don't give the agent the fake search tool")
+    parser.add_argument("--stream", action="store_true", help="Stream the analysis like the app does")
+    parser.add_argument("--two-phase", action="store_true",
+                        help="Findings first, research in the background, like the app; "
+                             "research is reported as the wait after the findings")
+    parser.add_argument("--rpm", type=int, default=1_000_000, help="Dispatcher requests-per-minute quota")
+    args = parser.parse_args(argv)
+
+    configure_fakes(load_config(args.config))
+    tools = () if args.no_search else ("fake_duckduckgo",)
+    agents = agent_pool("", "fake", tools, backend="fake")
+    vision_agents = agent_pool("", "fake", (), backend="fake") if args.two_phase else None
+    dispatcher = ThreadedDispatcher(
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.rpm * 10_000,
+        max_in_flight=args.concurrency,
+        max_waiting=args.requests,
+    )
+    uploads = make_uploads(args.kind, args.size, args.distinct)
+
+    results = defaultdict(list)
+    errors = defaultdict(int)
+
+    def worker(index):
+        data, name = uploads[index % len(uploads)]
+        try:
+            timings = one_request(agents, dispatcher, data, name, args.stream, vision_agents)
+        except Exception as e:
+            errors[type(e).__name__] += 1
+            return
+        for stage, seconds in timings.items():
+            results[stage].append(seconds)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    done = len(results["total"])
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"{args.kind} {args.size}x{args.size}: {done} ok, {sum(errors.values())} failed "
+          f"{dict(errors) or ''}")
+    print(f"throughput {done / elapsed:.2f} req/s ({done / elapsed * 60:.0f}/min) over {elapsed:.1f}s")
+    for stage in STAGES:
+        if results[stage]:
+            values = results[stage]
+            print(f"{stage:8s} p50 {percentile(values, 0.5) * 1e3:9.1f} ms  "
+                  f"p95 {percentile(values, 0.95) * 1e3:9.1f} ms  "
+                  f"p99 {percentile(values, 0.99) * 1e3:9.1f} ms")
+    print(f"dispatcher {dispatcher.dispatcher.stats}")
+
+
+if __name__ == "__main__":
+    main()
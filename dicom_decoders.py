@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import defaultdict
+from pydicom import uid
+from pydicom.pixel_data_handlers import (
+    gdcm_handler,
+    jpeg_ls_handler,
+    numpy_handler,
+    pillow_handler,
+    pylibjpeg_handler,
+    rle_handler,
+)
+
+# pydicom's bundled handlers, by the name Dataset.convert_pixel_data() accepts
+PYDICOM_HANDLERS = {
+    "numpy": numpy_handler,
+    "pylibjpeg": pylibjpeg_handler,
+    "gdcm": gdcm_handler,
+    "jpeg_ls": jpeg_ls_handler,
+    "pillow": pillow_handler,
+    "rle": rle_handler,
+}
+
+# Handlers to try per transfer syntax, fastest first. Unlisted syntaxes use
+# pydicom's own handler order.
+DECODER_PREFERENCE = {
+    uid.JPEGBaseline8Bit: ["pylibjpeg", "pillow", "gdcm"],
+    uid.JPEGExtended12Bit: ["pylibjpeg", "gdcm", "pillow"],
+    uid.JPEGLossless: ["pylibjpeg", "gdcm"],
+    uid.JPEGLosslessSV1: ["pylibjpeg", "gdcm"],
+    uid.JPEGLSLossless: ["pylibjpeg", "jpeg_ls", "gdcm"],
+    uid.JPEGLSNearLossless: ["pylibjpeg", "jpeg_ls", "gdcm"],
+    uid.JPEG2000Lossless: ["pylibjpeg", "gdcm", "pillow"],
+    uid.JPEG2000: ["pylibjpeg", "gdcm", "pillow"],
+    uid.RLELossless: ["pylibjpeg", "rle", "gdcm"],
+}
+
+# Decoders registered by name: (decode(ds) -> ndarray, supports(transfer_syntax) -> bool)
+DECODERS = {}
+
+_stats_lock = threading.Lock()
+# (transfer syntax name, decoder name) -> [decode count, total seconds]
+DECODE_STATS = defaultdict(lambda: [0, 0.0])
+
+def register_decoder(name, decode, supports, transfer_syntaxes=(), first=True):
+    """Register a decoder and put it at the front (or back) of the given syntaxes."""
+    DECODERS[name] = (decode, supports)
+    for transfer_syntax in transfer_syntaxes:
+        preference = DECODER_PREFERENCE.setdefault(transfer_syntax, [])
+        if name in preference:
+            preference.remove(name)
+        if first:
+            preference.insert(0, name)
+        else:
+            preference.append(name)
+
+def pydicom_decoder(name):
+    """Decoder function that runs one of pydicom's bundled handlers."""
+    def decode(ds):
+        ds.convert_pixel_data(handler_name=name)
+        pixel_array = ds.pixel_array
+        # pydicom keeps the decoded array on the dataset for as long as the
+        # dataset lives; drop it so the caller owns the only reference
+        ds._pixel_array = None
+        ds._pixel_id = {}
+        return pixel_array
+    return decode
+
+for _name, _handler in PYDICOM_HANDLERS.items():
+    register_decoder(
+        _name,
+        pydicom_decoder(_name),
+        lambda transfer_syntax, handler=_handler: (
+            handler.is_available() and handler.supports_transfer_syntax(transfer_syntax)
+        ),
+    )
+
+def available_decoders(transfer_syntax):
+    """Installed decoders able to handle the syntax, in preference order."""
+    preference = DECODER_PREFERENCE.get(transfer_syntax, list(PYDICOM_HANDLERS))
+    # Registered decoders missing from the preference list are tried last
+    names = preference + [name for name in DECODERS if name not in preference]
+    return [name for name in names if name in DECODERS and DECODERS[name][1](transfer_syntax)]
+
+def decode_pixel_data(ds):
+    """Decode a dataset's pixel data with the fastest installed decoder.
+
+    Decoders are tried in preference order; if one fails the next is used.
+    Decode time is recorded per (transfer syntax, decoder) in DECODE_STATS.
+    """
+    transfer_syntax = ds.file_meta.TransferSyntaxUID
+    names = available_decoders(transfer_syntax)
+    if not names:
+        raise Exception(
+            f"No installed decoder supports {transfer_syntax.name}; "
+            "install pylibjpeg, python-gdcm or Pillow"
+        )
+
+    errors = []
+    for name in names:
+        start = time.perf_counter()
+        try:
+            pixel_array = DECODERS[name][0](ds)
+        except Exception as e:
+            errors.append(f"{name}: {str(e)}")
+            continue
+        elapsed = time.perf_counter() - start
+        with _stats_lock:
+            stats = DECODE_STATS[(transfer_syntax.name, name)]
+            stats[0] += 1
+            stats[1] += elapsed
+        return pixel_array
+    raise Exception(f"Could not decode {transfer_syntax.name} ({'; '.join(errors)})")
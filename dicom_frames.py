@@ -0,0 +1,146 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from pydicom.dataset import Dataset
+from pydicom.encaps import encapsulate, generate_pixel_data_frame
+from pydicom.pixel_data_handlers.util import pixel_dtype
+from dicom_decoders import decode_pixel_data
+from dicom_pixels import DEFAULT_WINDOW, window_pixels
+
+# Image Pixel module attributes a single-frame decode needs
+FRAME_ATTRIBUTES = (
+    "Rows",
+    "Columns",
+    "SamplesPerPixel",
+    "PhotometricInterpretation",
+    "PlanarConfiguration",
+    "BitsAllocated",
+    "BitsStored",
+    "HighBit",
+    "PixelRepresentation",
+)
+
+def frame_count(ds):
+    """Number of frames in the dataset (1 when NumberOfFrames is absent)."""
+    return max(int(getattr(ds, "NumberOfFrames", 1) or 1), 1)
+
+def uniform_sample(count, size):
+    """Pick up to ``size`` evenly spaced frame indices out of ``count``."""
+    if size >= count:
+        return list(range(count))
+    return sorted({int(round(i)) for i in np.linspace(0, count - 1, size)})
+
+def key_frames(ds):
+    """Zero-based frames the modality flagged as key frames, if any."""
+    numbers = []
+    representative = getattr(ds, "RepresentativeFrameNumber", None)
+    if representative:
+        numbers.append(int(representative))
+    of_interest = getattr(ds, "FrameNumbersOfInterest", None)
+    if of_interest:
+        numbers.extend(int(n) for n in np.atleast_1d(of_interest))
+    count = frame_count(ds)
+    # DICOM frame numbers are 1-based
+    return sorted({n - 1 for n in numbers if 1 <= n <= count})
+
+class DicomFrames:
+    """Lazy, per-frame access to a (possibly multi-frame) DICOM dataset.
+
+    Frames are decoded only when requested and at most ``cache_size`` decoded
+    frames are kept, so memory follows the frames actually viewed rather
+    than NumberOfFrames.
+    """
+
+    def __init__(self, ds, cache_size=8):
+        self.ds = ds
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # Instances are shared between sessions through the decoded-upload cache
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return frame_count(self.ds)
+
+    @property
+    def nbytes(self):
+        """Raw pixel data plus the decoded frames currently cached."""
+        raw = len(self.ds.PixelData) if "PixelData" in self.ds else 0
+        return raw + sum(frame.nbytes for frame in list(self._cache.values()))
+
+    @property
+    def max_nbytes(self):
+        """Most this can hold: the raw pixel data plus a full cache of decoded frames."""
+        ds = self.ds
+        if "PixelData" not in ds:
+            return 0
+        frame = (int(ds.Rows) * int(ds.Columns) * int(getattr(ds, "SamplesPerPixel", 1))
+                 * pixel_dtype(ds).itemsize)
+        return len(ds.PixelData) + min(self.cache_size, len(self)) * frame
+
+    def __getitem__(self, index):
+        """Stored pixel values of one frame."""
+        if not 0 <= index < len(self):
+            raise IndexError(f"Frame {index} out of range (0-{len(self) - 1})")
+        with self._lock:
+            if index in self._cache:
+                self._cache.move_to_end(index)
+                return self._cache[index]
+
+            frame = self._decode(index)
+            self._cache[index] = frame
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return frame
+
+    def render(self, index=0, window=DEFAULT_WINDOW):
+        """Windowed uint8 pixels of one frame."""
+        return window_pixels(self.ds, self[index], window)
+
+    def _decode(self, index):
+        if len(self) == 1:
+            return decode_pixel_data(self.ds)
+        if self.ds.file_meta.TransferSyntaxUID.is_compressed:
+            return self._decode_encapsulated(index)
+        if int(self.ds.BitsAllocated) % 8:
+            # Bit-packed data cannot be sliced per frame: decode it all and
+            # copy the frame out, so the full array is freed on return
+            return decode_pixel_data(self.ds)[index].copy()
+        return self._decode_native(index)
+
+    def _decode_native(self, index):
+        """Zero-copy view of one frame of uncompressed pixel data."""
+        ds = self.ds
+        rows, columns = int(ds.Rows), int(ds.Columns)
+        samples = int(getattr(ds, "SamplesPerPixel", 1))
+        dtype = pixel_dtype(ds)
+        pixels_per_frame = rows * columns * samples
+        frame = np.frombuffer(
+            ds.PixelData,
+            dtype=dtype,
+            count=pixels_per_frame,
+            offset=index * pixels_per_frame * dtype.itemsize,
+        )
+        if samples == 1:
+            return frame.reshape(rows, columns)
+        if int(getattr(ds, "PlanarConfiguration", 0)) == 1:
+            return frame.reshape(samples, rows, columns).transpose(1, 2, 0)
+        return frame.reshape(rows, columns, samples)
+
+    def _decode_encapsulated(self, index):
+        """Decode one compressed frame through a single-frame copy of the dataset."""
+        ds = self.ds
+        fragments = generate_pixel_data_frame(ds.PixelData, len(self))
+        for _ in range(index):
+            next(fragments)
+        frame_bytes = next(fragments)
+
+        frame_ds = Dataset()
+        frame_ds.file_meta = ds.file_meta
+        frame_ds.is_little_endian = ds.is_little_endian
+        frame_ds.is_implicit_VR = ds.is_implicit_VR
+        for keyword in FRAME_ATTRIBUTES:
+            if keyword in ds:
+                setattr(frame_ds, keyword, ds.data_element(keyword).value)
+        frame_ds.NumberOfFrames = 1
+        frame_ds.PixelData = encapsulate([frame_bytes])
+        return decode_pixel_data(frame_ds)
@@ -0,0 +1,111 @@
+import pydicom
+from pydicom.dataset import FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, ImplicitVRLittleEndian
+from upload_limits import (
+    MAX_DECODED_BYTES,
+    MAX_FRAMES,
+    MAX_IMAGE_PIXELS,
+    UploadRejected,
+    check_frames,
+    check_pixels,
+)
+
+# Header fields worth passing on to the agent, with display labels
+PROMPT_FIELDS = {
+    "Modality": "Modality",
+    "BodyPartExamined": "Body part",
+    "StudyDescription": "Study",
+    "SeriesDescription": "Series",
+    "ViewPosition": "View position",
+    "PixelSpacing": "Pixel spacing (mm)",
+    "SliceThickness": "Slice thickness (mm)",
+}
+
+def summarize_dataset(ds):
+    """Compact dict of the header fields used for routing, limits and prompts."""
+    summary = {}
+    for keyword in PROMPT_FIELDS:
+        value = getattr(ds, keyword, None)
+        if value not in (None, ""):
+            summary[keyword] = str(value)
+
+    summary["Rows"] = int(getattr(ds, "Rows", 0) or 0)
+    summary["Columns"] = int(getattr(ds, "Columns", 0) or 0)
+    summary["NumberOfFrames"] = max(int(getattr(ds, "NumberOfFrames", 1) or 1), 1)
+    summary["SamplesPerPixel"] = int(getattr(ds, "SamplesPerPixel", 1) or 1)
+    summary["BitsAllocated"] = int(getattr(ds, "BitsAllocated", 8) or 8)
+
+    file_meta = getattr(ds, "file_meta", None)
+    transfer_syntax = getattr(file_meta, "TransferSyntaxUID", None)
+    if transfer_syntax:
+        summary["TransferSyntaxUID"] = str(transfer_syntax)
+        summary["TransferSyntax"] = transfer_syntax.name
+        summary["Compressed"] = transfer_syntax.is_compressed
+
+    summary["DecodedBytes"] = (
+        summary["Rows"] * summary["Columns"] * summary["NumberOfFrames"]
+        * summary["SamplesPerPixel"] * ((summary["BitsAllocated"] + 7) // 8)
+    )
+    return summary
+
+def read_dataset(dicom_file, stop_before_pixels=False):
+    """dcmread that also accepts streams without the preamble and file meta header.
+
+    Only call it on input sniffed as DICOM: ``force`` makes pydicom parse
+    anything. A missing transfer syntax is filled in from the VR encoding
+    pydicom detected, so the pixel decoders can dispatch on it.
+    """
+    ds = pydicom.dcmread(dicom_file, stop_before_pixels=stop_before_pixels, force=True)
+    if getattr(ds, "file_meta", None) is None:
+        ds.file_meta = FileMetaDataset()
+    if "TransferSyntaxUID" not in ds.file_meta:
+        ds.file_meta.TransferSyntaxUID = (
+            ImplicitVRLittleEndian if ds.is_implicit_VR else ExplicitVRLittleEndian
+        )
+    return ds
+
+def read_dicom_header(dicom_file):
+    """Header-only read that stops before the pixel data; returns the summary."""
+    try:
+        ds = read_dataset(dicom_file, stop_before_pixels=True)
+        return summarize_dataset(ds)
+    except Exception as e:
+        raise Exception(f"Error reading DICOM header: {str(e)}")
+
+def validate_header(summary, max_decoded_bytes=MAX_DECODED_BYTES, max_frames=MAX_FRAMES,
+                    max_pixels=MAX_IMAGE_PIXELS):
+    """Reject DICOMs without an image or over the frame, pixel or byte budgets, before decoding."""
+    if not summary["Rows"] or not summary["Columns"]:
+        raise UploadRejected("DICOM file does not contain an image")
+    check_frames(summary["NumberOfFrames"], max_frames)
+    check_pixels(summary["Columns"], summary["Rows"], max_pixels)
+    if summary["DecodedBytes"] > max_decoded_bytes:
+        raise UploadRejected(
+            f"DICOM image too large to decode ({summary['DecodedBytes'] / 1e6:.0f} MB, "
+            f"limit {max_decoded_bytes / 1e6:.0f} MB)"
+        )
+
+def describe_header(summary):
+    """One-line human-readable description for captions."""
+    parts = [summary[keyword] for keyword in ("Modality", "BodyPartExamined") if keyword in summary]
+    parts.append(f"{summary['Columns']}×{summary['Rows']}")
+    if summary["NumberOfFrames"] > 1:
+        parts.append(f"{summary['NumberOfFrames']} frames")
+    if "TransferSyntax" in summary:
+        parts.append(summary["TransferSyntax"])
+    return " · ".join(parts)
+
+def header_prompt_context(summary):
+    """Markdown block appended to the analysis query with known acquisition metadata."""
+    lines = [
+        f"- {label}: {summary[keyword]}"
+        for keyword, label in PROMPT_FIELDS.items()
+        if keyword in summary
+    ]
+    if not lines:
+        return ""
+    return (
+        "\n\nThe DICOM header of this image reports the following; use it to confirm "
+        "the modality and region, but rely on the image itself for findings:\n"
+        + "\n".join(lines)
+    )
@@ -0,0 +1,226 @@
+from functools import lru_cache
+import numpy as np
+from pydicom.multival import MultiValue
+
+# Integer dtypes small enough to normalize through a lookup table indexed by stored value
+LUT_DTYPES = (np.uint8, np.int8, np.uint16, np.int16)
+
+# np.take converts indices to intp internally, so apply LUTs in bounded chunks
+LUT_CHUNK_PIXELS = 1 << 20
+# Block size for min/max, small enough to stay in cache between the two reductions
+RANGE_CHUNK_BYTES = 1 << 18
+
+def rescale_parameters(ds):
+    """Return (slope, intercept) of the Modality LUT, defaulting to identity."""
+    slope = getattr(ds, "RescaleSlope", None)
+    intercept = getattr(ds, "RescaleIntercept", None)
+    slope = 1.0 if slope in (None, "") else float(slope)
+    intercept = 0.0 if intercept in (None, "") else float(intercept)
+    return slope, intercept
+
+def is_inverted(ds):
+    """MONOCHROME1 stores low values as white and must be inverted for display."""
+    return getattr(ds, "PhotometricInterpretation", "") == "MONOCHROME1"
+
+def lut_codes(dtype):
+    """Every stored value of an 8/16-bit dtype, ordered by its unsigned bit pattern."""
+    dtype = np.dtype(dtype)
+    unsigned = np.dtype(f"u{dtype.itemsize}")
+    return np.arange(1 << (8 * dtype.itemsize), dtype=unsigned).view(dtype)
+
+def lut_indices(pixel_array):
+    """Reinterpret stored values as LUT indices without copying."""
+    return pixel_array.view(np.dtype(f"u{pixel_array.dtype.itemsize}"))
+
+def value_range(pixel_array):
+    """(min, max) of an array, reading it from memory once.
+
+    Both reductions run over one cache-sized block of rows before moving
+    on to the next, instead of making two passes over the whole array.
+    """
+    rows = pixel_array
+    if rows.ndim > 2 and rows.flags.c_contiguous:
+        # Volumes and multi-sample frames: block by innermost rows, not whole slices
+        rows = rows.reshape(-1, rows.shape[-1])
+    if rows.ndim == 0 or rows.size == 0:
+        return float(rows.min()), float(rows.max())
+    step = max(1, RANGE_CHUNK_BYTES // max(rows[0].nbytes, 1))
+    low, high = None, None
+    for start in range(0, len(rows), step):
+        block = rows[start:start + step]
+        block_low, block_high = block.min(), block.max()
+        low = block_low if low is None else min(low, block_low)
+        high = block_high if high is None else max(high, block_high)
+    return float(low), float(high)
+
+def scale_to_uint8(values, low, high, invert=False, out=None):
+    """Linearly map float32 values in [low, high] onto 0..255, clipping outside."""
+    if out is None:
+        out = np.empty(values.shape, dtype=np.uint8)
+    if high <= low:
+        # Flat image: everything maps to black (white when inverted)
+        out.fill(255 if invert else 0)
+        return out
+    values -= np.float32(low)
+    values *= np.float32(255.0 / (high - low))
+    np.clip(values, 0, 255, out=values)
+    if invert:
+        np.subtract(np.float32(255), values, out=values)
+    np.copyto(out, values, casting="unsafe")
+    return out
+
+def apply_lut(lut, pixel_array, out=None):
+    """Map stored values through a uint8 LUT into a C-contiguous ``out``."""
+    if out is None:
+        out = np.empty(pixel_array.shape, dtype=np.uint8)
+    indices = lut_indices(pixel_array).reshape(-1)
+    flat_out = out.reshape(-1)
+    for start in range(0, indices.size, LUT_CHUNK_PIXELS):
+        stop = start + LUT_CHUNK_PIXELS
+        np.take(lut, indices[start:stop], out=flat_out[start:stop], mode="clip")
+    return out
+
+def normalize_pixels(pixel_array, slope=1.0, intercept=0.0, invert=False, out=None):
+    """Min-max normalize stored pixel values to uint8.
+
+    Values are first mapped through RescaleSlope/RescaleIntercept. 8/16-bit
+    integer data goes through a lookup table indexed by stored value, other
+    dtypes through a single float32 working buffer. The result is written
+    into ``out`` when given.
+    """
+    if out is None:
+        out = np.empty(pixel_array.shape, dtype=np.uint8)
+
+    identity = slope == 1.0 and intercept == 0.0
+    if pixel_array.dtype == np.uint8 and identity and not invert:
+        # Already display-ready 8-bit data is kept as is
+        np.copyto(out, pixel_array)
+        return out
+
+    if pixel_array.dtype.type in LUT_DTYPES:
+        low, high = value_range(pixel_array)
+        # The rescale is linear, so the extremes map to the extremes
+        ends = (low * slope + intercept, high * slope + intercept)
+        values = lut_codes(pixel_array.dtype).astype(np.float32)
+        if not identity:
+            values *= np.float32(slope)
+            values += np.float32(intercept)
+        lut = scale_to_uint8(values, min(ends), max(ends), invert)
+        return apply_lut(lut, pixel_array, out)
+
+    values = pixel_array.astype(np.float32)
+    if not identity:
+        values *= np.float32(slope)
+        values += np.float32(intercept)
+    return scale_to_uint8(values, *value_range(values), invert, out)
+
+
+# Window used when the caller does not pick one: the dataset's own VOI settings
+DEFAULT_WINDOW = "Default"
+# Plain min-max stretch over the stored values
+FULL_RANGE = "Full range"
+
+# Common (center, width) settings in Hounsfield units
+WINDOW_PRESETS = {
+    "Lung": (-600.0, 1500.0),
+    "Bone": (400.0, 1800.0),
+    "Brain": (40.0, 80.0),
+    "Soft tissue": (50.0, 400.0),
+}
+
+WINDOW_OPTIONS = [DEFAULT_WINDOW, FULL_RANGE] + list(WINDOW_PRESETS)
+
+def first_value(value):
+    """Return the first entry of a possibly multi-valued DICOM element as float."""
+    if isinstance(value, (list, tuple, MultiValue)):
+        value = value[0]
+    return float(value)
+
+def dataset_voi(ds):
+    """Return the dataset's own VOI transform as a hashable tuple, or None.
+
+    A VOI LUT Sequence takes precedence over Window Center/Width, matching
+    the order in which DICOM viewers apply them.
+    """
+    sequence = getattr(ds, "VOILUTSequence", None)
+    if sequence:
+        item = sequence[0]
+        entries, first_mapped, bits = [int(v) for v in item.LUTDescriptor]
+        data = item.LUTData
+        if isinstance(data, bytes):
+            data = np.frombuffer(data, dtype=np.uint16 if bits > 8 else np.uint8)
+        table = np.asarray(data, dtype=np.float32)[:entries or 65536]
+        return ("table", first_mapped, bits, table.tobytes())
+
+    center = getattr(ds, "WindowCenter", None)
+    width = getattr(ds, "WindowWidth", None)
+    if center is None or width is None:
+        return None
+    return ("linear", first_value(center), max(first_value(width), 1.0))
+
+def resolve_window(ds, window):
+    """Turn a window choice (option name or (center, width)) into a VOI tuple."""
+    if window in (None, DEFAULT_WINDOW):
+        return dataset_voi(ds)
+    if window == FULL_RANGE:
+        return None
+    if window in WINDOW_PRESETS:
+        center, width = WINDOW_PRESETS[window]
+    else:
+        center, width = window
+    return ("linear", float(center), max(float(width), 1.0))
+
+def voi_to_uint8(values, voi, invert=False, out=None):
+    """Apply a VOI tuple to float32 modality values, producing uint8."""
+    if voi[0] == "linear":
+        _, center, width = voi
+        if width <= 1:
+            # A width of 1 is a threshold (PS3.3 C.11.2.1.2.1): values up to
+            # center - 0.5 map to the minimum, values above it to the maximum
+            if out is None:
+                out = np.empty(values.shape, dtype=np.uint8)
+            np.multiply(values > np.float32(center - 0.5), 255, out=out, casting="unsafe")
+            if invert:
+                np.subtract(255, out, out=out)
+            return out
+        # DICOM PS3.3 C.11.2.1.2 linear window bounds
+        low = center - 0.5 - (width - 1) / 2
+        high = center - 0.5 + (width - 1) / 2
+        return scale_to_uint8(values, low, high, invert, out)
+
+    _, first_mapped, bits, table_bytes = voi
+    table = np.frombuffer(table_bytes, dtype=np.float32)
+    index = np.rint(values)
+    index -= first_mapped
+    np.clip(index, 0, table.size - 1, out=index)
+    mapped = table[index.astype(np.intp)]
+    return scale_to_uint8(mapped, 0, (1 << bits) - 1, invert, out)
+
+@lru_cache(maxsize=32)
+def window_lut(dtype_str, slope, intercept, voi, invert):
+    """Build (once per window setting) a uint8 LUT over every stored value."""
+    values = lut_codes(dtype_str).astype(np.float32)
+    values *= np.float32(slope)
+    values += np.float32(intercept)
+    lut = voi_to_uint8(values, voi, invert)
+    lut.flags.writeable = False
+    return lut
+
+def window_pixels(ds, pixel_array, window=DEFAULT_WINDOW, out=None):
+    """Window decoded stored values to uint8 without re-decoding the dataset."""
+    slope, intercept = rescale_parameters(ds)
+    invert = is_inverted(ds)
+    voi = resolve_window(ds, window)
+
+    # Colour data and datasets without VOI settings fall back to min-max
+    if voi is None or int(getattr(ds, "SamplesPerPixel", 1)) > 1:
+        return normalize_pixels(pixel_array, slope, intercept, invert, out)
+
+    if pixel_array.dtype.type in LUT_DTYPES:
+        lut = window_lut(pixel_array.dtype.str, slope, intercept, voi, invert)
+        return apply_lut(lut, pixel_array, out)
+
+    values = pixel_array.astype(np.float32)
+    values *= np.float32(slope)
+    values += np.float32(intercept)
+    return voi_to_uint8(values, voi, invert, out)
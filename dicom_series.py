@@ -0,0 +1,217 @@
+import io
+import zipfile
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from pydicom.dataset import Dataset
+from pydicom.errors import InvalidDicomError
+from pydicom.pixel_data_handlers.util import pixel_dtype
+from dicom_decoders import decode_pixel_data
+from dicom_header import PROMPT_FIELDS, read_dataset
+from dicom_pixels import DEFAULT_WINDOW, rescale_parameters, window_pixels
+from upload_formats import SNIFF_BYTES, sniff, sniff_upload
+from upload_limits import (
+    UploadRejected,
+    check_decoded_bytes,
+    check_frames,
+    check_pixels,
+    check_upload_bytes,
+)
+
+PLANES = ["Axial", "Coronal", "Sagittal"]
+
+# Attributes the windowing stage reads from the per-series header
+HEADER_ATTRIBUTES = (
+    "Modality",
+    "BodyPartExamined",
+    "SeriesDescription",
+    "PhotometricInterpretation",
+    "SamplesPerPixel",
+    "WindowCenter",
+    "WindowWidth",
+    "VOILUTSequence",
+)
+
+def expand_uploads(uploaded_files):
+    """Yield a file-like object for every upload, unpacking zip archives."""
+    for uploaded_file in uploaded_files:
+        if sniff_upload(uploaded_file) == "zip":
+            with zipfile.ZipFile(uploaded_file) as archive:
+                # Sizes come from the central directory, so zip bombs stop here
+                members = [info for info in archive.infolist() if not info.is_dir()]
+                check_frames(len(members))
+                check_upload_bytes(sum(info.file_size for info in members))
+                for info in members:
+                    yield io.BytesIO(archive.read(info))
+        else:
+            yield uploaded_file
+
+def read_slice(fileobj):
+    """Parse one slice without decoding its pixels; None for non-image files."""
+    fileobj.seek(0)
+    if sniff(fileobj.read(SNIFF_BYTES)) != "dicom":
+        # Readmes and other non-DICOM members of an archive
+        return None
+    try:
+        fileobj.seek(0)
+        ds = read_dataset(fileobj)
+    except (InvalidDicomError, EOFError):
+        return None
+    if "PixelData" not in ds:
+        return None
+    return ds
+
+def slice_position(ds):
+    """Position of a slice along its normal, falling back to InstanceNumber."""
+    if "ImagePositionPatient" in ds and "ImageOrientationPatient" in ds:
+        orientation = np.asarray(ds.ImageOrientationPatient, dtype=float)
+        normal = np.cross(orientation[:3], orientation[3:])
+        return float(np.dot(normal, np.asarray(ds.ImagePositionPatient, dtype=float)))
+    return float(getattr(ds, "InstanceNumber", 0) or 0)
+
+def slice_spacing(slices):
+    """Distance between consecutive slices in mm."""
+    positions = [slice_position(ds) for ds in slices]
+    if len(positions) > 1 and "ImagePositionPatient" in slices[0]:
+        gaps = np.abs(np.diff(positions))
+        gaps = gaps[gaps > 0]
+        if gaps.size:
+            return float(np.median(gaps))
+    return float(getattr(slices[0], "SliceThickness", 1.0) or 1.0)
+
+def series_header(ds, slope, intercept, volume):
+    """Minimal dataset for the whole volume: what window_pixels and summarize_dataset read.
+
+    Descriptive fields come from ``ds``, a representative slice; the image
+    size and frame count are the stacked volume's.
+    """
+    header = Dataset()
+    for keyword in HEADER_ATTRIBUTES + tuple(PROMPT_FIELDS):
+        if keyword in ds:
+            setattr(header, keyword, ds.data_element(keyword).value)
+    header.RescaleSlope = slope
+    header.RescaleIntercept = intercept
+    header.NumberOfFrames, header.Rows, header.Columns = volume.shape
+    header.BitsAllocated = volume.dtype.itemsize * 8
+    if getattr(ds, "file_meta", None) is not None:
+        header.file_meta = ds.file_meta
+    return header
+
+class DicomVolume:
+    """A sorted, stacked DICOM series with MPR and MIP views.
+
+    ``volume`` is indexed (slice, row, column) with slices ordered along the
+    slice normal; ``spacing`` holds the matching voxel size in mm.
+    """
+
+    def __init__(self, volume, spacing, header, series_uid):
+        self.volume = volume
+        self.spacing = spacing
+        self.header = header
+        self.series_uid = series_uid
+
+    @property
+    def nbytes(self):
+        return self.volume.nbytes
+
+    @property
+    def label(self):
+        description = getattr(self.header, "SeriesDescription", "") or self.series_uid
+        return f"{description} ({len(self.volume)} slices)"
+
+    def plane_size(self, plane):
+        """Number of slices available in a plane."""
+        return self.volume.shape[{"Axial": 0, "Coronal": 1, "Sagittal": 2}[plane]]
+
+    def aspect(self, plane):
+        """Physical height / width of one displayed pixel."""
+        z, y, x = self.spacing
+        return {"Axial": y / x, "Coronal": z / x, "Sagittal": z / y}[plane]
+
+    def view(self, plane, index):
+        """Stored values of one MPR slice, superior at the top for coronal/sagittal."""
+        if plane == "Axial":
+            return self.volume[index]
+        if plane == "Coronal":
+            return self.volume[::-1, index, :]
+        return self.volume[::-1, :, index]
+
+    def mip(self, plane):
+        """Maximum intensity projection along the plane's normal."""
+        if plane == "Axial":
+            return self.volume.max(axis=0)
+        if plane == "Coronal":
+            return self.volume[::-1].max(axis=1)
+        return self.volume[::-1].max(axis=2)
+
+    def render(self, plane, index=None, window=DEFAULT_WINDOW, mip=False):
+        """Windowed uint8 pixels of an MPR slice (middle slice by default) or MIP."""
+        if mip:
+            pixels = self.mip(plane)
+        else:
+            if index is None:
+                index = self.plane_size(plane) // 2
+            pixels = self.view(plane, index)
+        return window_pixels(self.header, pixels, window)
+
+def build_volume(slices, pool):
+    """Sort one series' slices and decode them in parallel into a contiguous volume."""
+    if int(getattr(slices[0], "SamplesPerPixel", 1)) != 1:
+        raise Exception("Only grayscale series can be stacked into a volume")
+
+    # Drop slices whose size differs from the bulk of the series (e.g. localizers)
+    size = Counter((int(ds.Rows), int(ds.Columns)) for ds in slices).most_common(1)[0][0]
+    slices = sorted(
+        (ds for ds in slices if (int(ds.Rows), int(ds.Columns)) == size),
+        key=slice_position,
+    )
+
+    # Per-slice rescales (e.g. PET) are baked into a float32 volume
+    rescales = {rescale_parameters(ds) for ds in slices}
+    if len(rescales) == 1:
+        slope, intercept = rescales.pop()
+        dtype = pixel_dtype(slices[0]).newbyteorder("=")
+    else:
+        slope, intercept = 1.0, 0.0
+        dtype = np.dtype(np.float32)
+    # Budgets are checked from the headers before the volume is allocated
+    check_frames(len(slices))
+    check_pixels(size[1], size[0])
+    check_decoded_bytes(len(slices) * size[0] * size[1] * dtype.itemsize)
+    volume = np.empty((len(slices),) + size, dtype=dtype)
+
+    def fill(index):
+        ds = slices[index]
+        pixels = decode_pixel_data(ds)
+        if dtype == np.float32:
+            slice_slope, slice_intercept = rescale_parameters(ds)
+            np.multiply(pixels, slice_slope, out=volume[index], casting="unsafe")
+            volume[index] += slice_intercept
+        else:
+            volume[index] = pixels
+        # The raw bytes are no longer needed once the slice is stacked
+        del ds.PixelData
+
+    list(pool.map(fill, range(len(slices))))
+
+    row_spacing, column_spacing = [float(v) for v in getattr(slices[0], "PixelSpacing", [1.0, 1.0])]
+    spacing = (slice_spacing(slices), row_spacing, column_spacing)
+    header = series_header(slices[0], slope, intercept, volume)
+    return DicomVolume(volume, spacing, header, getattr(slices[0], "SeriesInstanceUID", ""))
+
+def load_series(uploaded_files, max_workers=None):
+    """Group uploaded slices (files or zips) by SeriesInstanceUID into volumes."""
+    try:
+        with ThreadPoolExecutor(max_workers) as pool:
+            parsed = pool.map(read_slice, expand_uploads(uploaded_files))
+            groups = defaultdict(list)
+            for ds in parsed:
+                if ds is not None:
+                    groups[getattr(ds, "SeriesInstanceUID", "")].append(ds)
+            if not groups:
+                raise Exception("No DICOM images found in the upload")
+            return [build_volume(slices, pool) for slices in groups.values()]
+    except UploadRejected:
+        raise
+    except Exception as e:
+        raise Exception(f"Error processing DICOM series: {str(e)}")
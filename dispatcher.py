@@ -0,0 +1,195 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+# Defaults matching the Gemini 1.5 Flash free tier
+REQUESTS_PER_MINUTE = 15
+TOKENS_PER_MINUTE = 1_000_000
+
+# Lower runs first
+INTERACTIVE_PRIORITY = 0
+BATCH_PRIORITY = 10
+
+# Gemini bills a fixed number of tokens per image, plus the generated report
+TOKENS_PER_IMAGE = 258
+OUTPUT_TOKEN_BUDGET = 2048
+
+class DispatcherBusy(Exception):
+    """Raised instead of queueing when the wait queue is full and the caller won't block."""
+
+def estimate_tokens(prompt, image_count=1):
+    """Rough token cost of one analysis request (about 4 characters per token)."""
+    return len(prompt) // 4 + image_count * TOKENS_PER_IMAGE + OUTPUT_TOKEN_BUDGET
+
+def status_code(error):
+    """HTTP status carried by a client library's exception, or None."""
+    for value in (getattr(error, "status_code", None), getattr(error, "code", None),
+                  getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    return None
+
+def is_rate_limited(error):
+    """Whether an exception is a provider 429 / quota error."""
+    if status_code(error) == 429:
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in (
+        "resourceexhausted", "resource has been exhausted", "rate limit", "quota",
+    ))
+
+class TokenBucket:
+    """Continuously refilling bucket of ``per_minute`` units, at most ``capacity`` banked."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def take(self, amount=1):
+        """Wait until ``amount`` units are available and consume them."""
+        amount = min(amount, self.capacity)
+        # The lock keeps waiters first-come first-served
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Empty the bucket so nothing is granted for roughly ``seconds``."""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+class AgentDispatcher:
+    """Admission control for agent calls.
+
+    A call waits for (in order) room in the wait queue, an in-flight slot
+    handed out by priority, one request from the requests/minute bucket and
+    its estimated tokens from the tokens/minute bucket. When the wait queue
+    is full, callers either wait (backpressure) or get DispatcherBusy. A
+    rate-limit error from the provider pauses both buckets.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_in_flight=4, max_waiting=32, cooldown_seconds=20.0):
+        self.max_in_flight = max_in_flight
+        self.cooldown_seconds = cooldown_seconds
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._admission = asyncio.Semaphore(max_in_flight + max_waiting)
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self.stats = {"completed": 0, "failed": 0, "rate_limited": 0, "rejected": 0}
+
+    async def acquire(self, tokens=OUTPUT_TOKEN_BUDGET, priority=INTERACTIVE_PRIORITY, block=True):
+        """Wait for permission to make one call; pair with release()."""
+        if not block and self._admission.locked():
+            self.stats["rejected"] += 1
+            raise DispatcherBusy("Too many analyses are queued, please try again shortly")
+        await self._admission.acquire()
+        try:
+            await self._wait_turn(priority)
+            try:
+                await self._requests.take(1)
+                await self._tokens.take(tokens)
+            except BaseException:
+                self._release_turn()
+                raise
+        except BaseException:
+            self._admission.release()
+            raise
+
+    def release(self, error=None):
+        """Give the slot back; pass the call's exception to react to rate limits."""
+        if error is None:
+            self.stats["completed"] += 1
+        else:
+            self.stats["failed"] += 1
+            if is_rate_limited(error):
+                self.stats["rate_limited"] += 1
+                self._requests.pause(self.cooldown_seconds)
+                self._tokens.pause(self.cooldown_seconds)
+        self._release_turn()
+        self._admission.release()
+
+    async def run(self, func, *args, tokens=OUTPUT_TOKEN_BUDGET, priority=INTERACTIVE_PRIORITY, block=True):
+        """Run a blocking ``func(*args)`` in a worker thread once admitted."""
+        await self.acquire(tokens, priority, block)
+        try:
+            result = await asyncio.to_thread(func, *args)
+        except Exception as e:
+            self.release(e)
+            raise
+        self.release()
+        return result
+
+    async def _wait_turn(self, priority):
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if future.done() and not future.cancelled():
+                self._release_turn()
+            raise
+
+    def _release_turn(self):
+        # Hand the slot straight to the most urgent live waiter
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+class ThreadedDispatcher:
+    """An AgentDispatcher on its own event-loop thread, for synchronous callers."""
+
+    def __init__(self, **options):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.dispatcher = self._call(self._create(options))
+
+    @staticmethod
+    async def _create(options):
+        # Build the asyncio primitives on the loop that will use them
+        return AgentDispatcher(**options)
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    @contextmanager
+    def slot(self, tokens=OUTPUT_TOKEN_BUDGET, priority=INTERACTIVE_PRIORITY, block=True):
+        """Hold one admitted call slot for the body of the ``with`` block."""
+        self._call(self.dispatcher.acquire(tokens, priority, block))
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.loop.call_soon_threadsafe(self.dispatcher.release, error)
+
+    def run(self, func, *args, tokens=OUTPUT_TOKEN_BUDGET, priority=INTERACTIVE_PRIORITY, block=True):
+        """Blocking equivalent of AgentDispatcher.run."""
+        with self.slot(tokens, priority, block):
+            return func(*args)
@@ -0,0 +1,179 @@
+"""Local stand-ins for Gemini and DuckDuckGo, for load and latency testing.
+
+Select them by configuration: ``MODEL_BACKEND=fake`` for the model and
+``AGENT_TOOLS=fake_duckduckgo`` for search (the fake search tool also works
+with the real model). Their behaviour is read from ``FAKE_SERVICES``, a
+JSON string or the path of a JSON file, merged over FAKE_DEFAULTS.
+
+Reports are deterministic for given inputs. Latencies and injected failures
+come from one random generator seeded with ``seed``, so a single-threaded
+run is reproducible.
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from phi.tools.duckduckgo import DuckDuckGo
+from agent_factory import GuardedDuckDuckGo
+from model_backends import StubAgent, StubResponse
+
+FAKE_DEFAULTS = {
+    "seed": 0,
+    "model": {
+        # Log-normal time to first token: median seconds and shape
+        "first_token_median": 1.5,
+        "first_token_sigma": 0.5,
+        "output_tokens": 600,
+        "tokens_per_second": 80.0,
+        # Share of runs that fail with a 503 / a 429
+        "failure_rate": 0.0,
+        "rate_limit_rate": 0.0,
+        # Searches made per run when the agent has a search tool, drawn from
+        # this many distinct topics; batched into one parallel call if possible
+        "searches": 2,
+        "search_topics": 50,
+        "batch_searches": True,
+    },
+    "search": {
+        "latency_median": 0.8,
+        "latency_sigma": 0.6,
+        "failure_rate": 0.0,
+        "results": 5,
+    },
+}
+
+# Roughly 4 characters per token
+CHARS_PER_TOKEN = 4
+TOKENS_PER_CHUNK = 20
+
+_config = None
+_rng = None
+_rng_lock = threading.Lock()
+
+def configure_fakes(overrides=None):
+    """Set the fakes' behaviour; ``overrides`` is merged over FAKE_DEFAULTS per section."""
+    global _config, _rng
+    config = {key: dict(value) if isinstance(value, dict) else value
+              for key, value in FAKE_DEFAULTS.items()}
+    for key, value in (overrides or {}).items():
+        if isinstance(value, dict):
+            config[key].update(value)
+        else:
+            config[key] = value
+    with _rng_lock:
+        _config = config
+        _rng = random.Random(config["seed"])
+    return config
+
+def load_config(value):
+    """FAKE_SERVICES value (inline JSON or a file path) as a dict."""
+    if not value:
+        return {}
+    if value.lstrip().startswith("{"):
+        return json.loads(value)
+    with open(value) as f:
+        return json.load(f)
+
+def fake_config():
+    if _config is None:
+        configure_fakes(load_config(os.environ.get("FAKE_SERVICES")))
+    return _config
+
+def draw_latency(median, sigma):
+    """Log-normal sample with the given median (seconds)."""
+    fake_config()
+    with _rng_lock:
+        return _rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+def draw_index(count):
+    fake_config()
+    with _rng_lock:
+        return _rng.randrange(count)
+
+def draw_failure(*rates):
+    """Index of the injected failure among ``rates`` that fires, or None."""
+    fake_config()
+    with _rng_lock:
+        roll = _rng.random()
+    for index, rate in enumerate(rates):
+        if roll < rate:
+            return index
+        roll -= rate
+    return None
+
+class FakeSearch(DuckDuckGo):
+    """DuckDuckGo with the network call replaced by a simulated one."""
+
+    def _fake_results(self, kind, query, max_results):
+        settings = fake_config()["search"]
+        time.sleep(draw_latency(settings["latency_median"], settings["latency_sigma"]))
+        if draw_failure(settings["failure_rate"]) is not None:
+            raise ConnectionError("503 Service Unavailable (injected by fake search)")
+        count = min(max_results, settings["results"])
+        return json.dumps([
+            {
+                "title": f"Fake {kind} result {index + 1} for {query}",
+                "href": f"https://example.org/{kind}/{zlib.crc32(query.encode()) + index:08x}",
+                "body": f"Deterministic placeholder text about {query}.",
+            }
+            for index in range(count)
+        ], indent=2)
+
+    def duckduckgo_search(self, query: str, max_results: int = 5) -> str:
+        return self._fake_results("search", query, max_results)
+
+    def duckduckgo_news(self, query: str, max_results: int = 5) -> str:
+        return self._fake_results("news", query, max_results)
+
+class FakeDuckDuckGo(GuardedDuckDuckGo, FakeSearch):
+    """The app's search tool (timeouts, retries, breaker) over the fake search."""
+
+class FakeGeminiAgent(StubAgent):
+    """Stub agent with Gemini-like latency, output size, tool use and failures."""
+
+    def __init__(self, model_id="fake", tools=()):
+        super().__init__(model_id)
+        self.search_tools = [tool for tool in tools if hasattr(tool, "duckduckgo_search")]
+
+    def _generate(self, query, images):
+        settings = fake_config()["model"]
+        time.sleep(draw_latency(settings["first_token_median"], settings["first_token_sigma"]))
+        failure = draw_failure(settings["failure_rate"], settings["rate_limit_rate"])
+        if failure == 0:
+            raise ConnectionError("503 Service Unavailable (injected by fake model)")
+        if failure == 1:
+            raise RuntimeError("429 Resource has been exhausted (injected by fake model)")
+        # The model searches before it writes, like the real agent's tool calls
+        queries = [
+            f"reference topic {draw_index(settings['search_topics'])} treatment guidelines"
+            for _ in range(settings["searches"])
+        ]
+        for tool in self.search_tools:
+            if settings["batch_searches"] and hasattr(tool, "duckduckgo_search_many"):
+                tool.duckduckgo_search_many(queries)
+            else:
+                for query in queries:
+                    tool.duckduckgo_search(query)
+
+        report = "".join(self.report_sections(query, images))
+        target = settings["output_tokens"] * CHARS_PER_TOKEN
+        if len(report) < target:
+            report += "Filler text to reach the configured output size. " * (
+                (target - len(report)) // 49 + 1
+            )
+            report = report[:target]
+        chunk_chars = TOKENS_PER_CHUNK * CHARS_PER_TOKEN
+        chunk_seconds = TOKENS_PER_CHUNK / settings["tokens_per_second"]
+        for start in range(0, len(report), chunk_chars):
+            if start:
+                time.sleep(chunk_seconds)
+            yield StubResponse(report[start:start + chunk_chars])
+
+    def run(self, query, images=None, stream=False, **kwargs):
+        chunks = self._generate(query, images)
+        if stream:
+            return chunks
+        return StubResponse("".join(chunk.content for chunk in chunks))
@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# Memory budget for decoded uploads shared by all sessions of the server
+MAX_DECODED_BYTES = 512 << 20
+
+def content_hash(uploaded_file):
+    """Hex digest of the upload's bytes, read through a zero-copy buffer."""
+    return hashlib.blake2b(uploaded_file.getbuffer(), digest_size=16).hexdigest()
+
+def estimated_size(value):
+    """Approximate bytes held by a cached value.
+
+    Values that decode lazily and grow after they are cached (DICOM frames,
+    TIFF pages) report ``max_nbytes`` and are charged for their ceiling.
+    """
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    if isinstance(value, (list, tuple)):
+        return sum(estimated_size(item) for item in value)
+    size = getattr(value, "max_nbytes", None)
+    if size is None:
+        size = getattr(value, "nbytes", 0)
+    return int(size)
+
+class ByteBudgetLRU:
+    """Thread-safe LRU cache that evicts by total estimated size, not entry count."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Cached value for ``key`` or None; counts a hit or a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, size=None):
+        """Store a value, evicting least recently used entries to fit the budget."""
+        if size is None:
+            size = estimated_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # Larger than the whole budget, don't cache
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get_or_create(self, key, factory):
+        """Return the cached value, computing and caching it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and memory held, for display."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+# Decoded uploads keyed by (kind, content hash, ...), shared across reruns and sessions
+DECODED_UPLOADS = ByteBudgetLRU(MAX_DECODED_BYTES)
@@ -0,0 +1,60 @@
+from PIL import Image
+from image_cache import ByteBudgetLRU
+
+# Width of the on-screen thumbnail
+PREVIEW_WIDTH = 500
+# Longest side of the image sent for analysis; smaller images are sent as is
+ANALYSIS_MAX_SIDE = 1024
+
+# Downscaled images keyed by (source key, target size)
+PREVIEWS = ByteBudgetLRU(128 << 20)
+
+def width_fit(size, target_width=PREVIEW_WIDTH):
+    """Size with the given width and the source aspect ratio."""
+    width, height = size
+    return target_width, max(1, int(target_width * height / width))
+
+def side_fit(size, max_side=ANALYSIS_MAX_SIDE):
+    """Size whose longest side is at most ``max_side``, never upscaling."""
+    width, height = size
+    scale = min(1.0, max_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def source_fit(size):
+    """Smallest size a source image needs to serve both the thumbnail and the analysis image."""
+    display, analysis = width_fit(size), side_fit(size)
+    return max(display[0], analysis[0]), max(display[1], analysis[1])
+
+def downscale(image, size):
+    """Resize with a cheap integer box reduce first, then a Lanczos resample.
+
+    ``Image.reduce`` shrinks by the largest factor that keeps the image at
+    least as big as the target, so the quality filter only runs on a small
+    image instead of the full-resolution one.
+    """
+    if image.size == size:
+        return image
+    factor = min(image.width // size[0], image.height // size[1])
+    if factor >= 2 and image.mode in ("L", "LA", "RGB", "RGBA", "I", "F"):
+        image = image.reduce(factor)
+    return image.resize(size, Image.LANCZOS)
+
+def cached_downscale(key, render, size_for):
+    """Downscale ``render()`` to ``size_for(image.size)``, cached per key and target.
+
+    ``render`` is only called on a cache miss, so reruns skip both the
+    source render and the resample.
+    """
+    def create():
+        image = render()
+        return downscale(image, size_for(image.size))
+
+    return PREVIEWS.get_or_create((key, size_for.__name__), create)
+
+def display_preview(key, render):
+    """Thumbnail for on-screen display."""
+    return cached_downscale(key, render, width_fit)
+
+def analysis_image(key, render):
+    """Image at analysis resolution, independent of the display thumbnail."""
+    return cached_downscale(key, render, side_fit)
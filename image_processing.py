@@ -0,0 +1,161 @@
+import io
+import os
+from PIL import Image
+from dicom_frames import DicomFrames
+from dicom_header import read_dataset, read_dicom_header, validate_header
+from dicom_pixels import DEFAULT_WINDOW
+from image_previews import ANALYSIS_MAX_SIDE, source_fit
+from slide_pyramid import SlidePyramid, is_pyramid
+from tiff_pages import TiffPages
+from upload_formats import sniff_upload
+from upload_limits import UploadRejected, check_upload_bytes, open_image
+
+class NamedBytesIO(io.BytesIO):
+    """In-memory file with a name, usable wherever an UploadedFile is expected."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+def load_local_file(path):
+    """Read a file from disk into an upload-like object."""
+    with open(path, "rb") as f:
+        return NamedBytesIO(f.read(), os.path.basename(path))
+
+def dicom_buffer(uploaded_file):
+    """Return a seekable in-memory view of the uploaded DICOM bytes."""
+    # Streamlit's UploadedFile is already a BytesIO, so hand it over as-is
+    if isinstance(uploaded_file, io.BytesIO):
+        uploaded_file.seek(0)
+        return uploaded_file
+    return io.BytesIO(uploaded_file.getbuffer())
+
+def decode_dicom(dicom_file):
+    """Read a DICOM file (path or file-like); frames are decoded lazily on access."""
+    try:
+        return DicomFrames(read_dataset(dicom_file))
+    except Exception as e:
+        raise Exception(f"Error processing DICOM file: {str(e)}")
+
+def render_dicom(frames, window=DEFAULT_WINDOW, index=0):
+    """Convert one decoded DICOM frame to a PIL Image using the requested window."""
+    try:
+        return Image.fromarray(frames.render(index, window))
+    except Exception as e:
+        raise Exception(f"Error processing DICOM file: {str(e)}")
+
+def process_dicom(dicom_file, window=DEFAULT_WINDOW, index=0):
+    """Process DICOM file and convert to PIL Image."""
+    return render_dicom(decode_dicom(dicom_file), window, index)
+
+def render_volume(volume, plane, index=None, window=DEFAULT_WINDOW, mip=False):
+    """Render an MPR slice or MIP of a DICOM volume at its physical aspect ratio."""
+    try:
+        image = Image.fromarray(volume.render(plane, index, window, mip))
+        height = max(1, round(image.height * volume.aspect(plane)))
+        if height != image.height:
+            image = image.resize((image.width, height))
+        return image
+    except Exception as e:
+        raise Exception(f"Error processing DICOM series: {str(e)}")
+
+def check_upload(uploaded_file):
+    """Reject uploads over the byte budget before anything else reads them."""
+    size = getattr(uploaded_file, "size", None)
+    check_upload_bytes(len(uploaded_file.getbuffer()) if size is None else size)
+
+def inspect_uploaded_dicom(uploaded_file):
+    """Header-only summary of an uploaded DICOM, validated before any decoding."""
+    check_upload(uploaded_file)
+    summary = read_dicom_header(dicom_buffer(uploaded_file))
+    validate_header(summary)
+    return summary
+
+def decode_uploaded_dicom(uploaded_file):
+    """Parse an uploaded DICOM from memory; frames are decoded lazily on access."""
+    # Cheap header check first so bad or oversized files never reach the decoder
+    inspect_uploaded_dicom(uploaded_file)
+    return decode_dicom(dicom_buffer(uploaded_file))
+
+def is_dicom_upload(uploaded_file):
+    """Whether the upload should go down the DICOM path, by content, not by name."""
+    return sniff_upload(uploaded_file) == "dicom"
+
+def is_tiff_upload(uploaded_file):
+    """Whether the upload should go down the TIFF path, by content, not by name."""
+    return sniff_upload(uploaded_file) == "tiff"
+
+def open_tiff(uploaded_file):
+    """Parse the page directories of an uploaded TIFF; pixels are read lazily."""
+    check_upload(uploaded_file)
+    try:
+        # Zero-copy view of the upload's bytes
+        return TiffPages(uploaded_file.getbuffer())
+    except UploadRejected:
+        raise
+    except Exception as e:
+        raise Exception(f"Error processing TIFF file: {str(e)}")
+
+def process_tiff(uploaded_file, page=0, max_side=None):
+    """Render one page of a TIFF, decoding only the tiles or strips it needs.
+
+    With ``max_side`` the page is sampled down while it is read, so large
+    pages never exist in memory at full resolution. Whole-slide pyramids are
+    never read at full resolution: they give their overview instead.
+    """
+    try:
+        tiff = open_tiff(uploaded_file)
+        if is_pyramid(tiff):
+            return SlidePyramid(tiff).overview(max_side or ANALYSIS_MAX_SIDE)
+        return tiff.render(page, max_side=max_side)
+    except UploadRejected:
+        raise
+    except Exception as e:
+        raise Exception(f"Error processing TIFF file: {str(e)}")
+
+def decode_image_upload(uploaded_file, session_id=None, window=DEFAULT_WINDOW):
+    """PNG, JPEG and other formats Pillow opens lazily.
+
+    JPEGs are decoded at the largest 1/2-1/8 DCT reduction that still
+    covers the preview and analysis sizes, instead of at full resolution.
+    """
+    # Header-only open: the size is checked before any pixels are decoded
+    check_upload(uploaded_file)
+    image = open_image(uploaded_file, size_for=source_fit)
+
+    # Convert to RGB if needed
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    return image
+
+# Decoders by sniffed format (see upload_formats.register_format):
+# decode(uploaded_file, session_id, window) -> PIL image
+UPLOAD_DECODERS = {}
+
+def register_upload_decoder(name, decode):
+    """Decode uploads of format ``name`` with ``decode``, replacing any previous decoder."""
+    UPLOAD_DECODERS[name] = decode
+
+register_upload_decoder(
+    "dicom",
+    lambda uploaded_file, session_id, window: render_dicom(
+        decode_uploaded_dicom(uploaded_file), window
+    ),
+)
+register_upload_decoder("tiff", lambda uploaded_file, session_id, window: process_tiff(uploaded_file))
+register_upload_decoder("png", decode_image_upload)
+register_upload_decoder("jpeg", decode_image_upload)
+
+def process_uploaded_file(uploaded_file, session_id=None, window=DEFAULT_WINDOW):
+    """Process uploaded file based on its format, sniffed from its first bytes."""
+    try:
+        # The name is ignored: extensionless and misnamed files are common from PACS exports
+        file_format = sniff_upload(uploaded_file)
+        decode = UPLOAD_DECODERS.get(file_format)
+        if decode is None:
+            raise Exception(f"Unsupported file format ({file_format or 'unrecognized'})")
+        return decode(uploaded_file, session_id, window)
+    except UploadRejected:
+        raise
+    except Exception as e:
+        raise Exception(f"Error processing uploaded file: {str(e)}")
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import random
+import re
+import time
+from phi.agent import Agent
+from phi.model.google import Gemini
+
+# Which backend the app and the batch CLI use; override with MODEL_BACKEND
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "gemini")
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+
+class ModelBackend:
+    """How to build an agent for one kind of model.
+
+    ``build(api_key, model_id, tools)`` returns an object with the agent
+    interface the app relies on: ``run(query, images=..., stream=...)``
+    returning a response with ``.content`` (or an iterator of them when
+    streaming), and a ``memory`` with ``clear()``.
+    """
+
+    def __init__(self, name, build, default_model, needs_api_key=True):
+        self.name = name
+        self.build = build
+        self.default_model = default_model
+        self.needs_api_key = needs_api_key
+
+# Backends registered by name
+BACKENDS = {}
+
+def register_backend(name, build, default_model, needs_api_key=True):
+    BACKENDS[name] = ModelBackend(name, build, default_model, needs_api_key)
+
+def get_backend(name=MODEL_BACKEND):
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown model backend {name!r}, expected one of: {', '.join(BACKENDS)}"
+        ) from None
+
+def build_gemini(api_key, model_id, tools):
+    return Agent(
+        model=Gemini(
+            api_key=api_key,
+            id=model_id
+        ),
+        tools=tools,
+        markdown=True
+    )
+
+def build_ollama(api_key, model_id, tools):
+    """A vision model served by a local Ollama instance (no API key, no cloud calls)."""
+    # Optional dependency, only needed for this backend
+    from phi.model.ollama import Ollama
+
+    return Agent(
+        model=Ollama(id=model_id, host=OLLAMA_HOST),
+        tools=tools,
+        markdown=True
+    )
+
+class StubResponse:
+    def __init__(self, content):
+        self.content = content
+
+class StubAgent:
+    """Deterministic offline stand-in for the analysis agent.
+
+    The report answers every ``### `` section the query asks for, with
+    wording derived from a hash of the query and image bytes, so the same
+    inputs always give the same report. Optional delays imitate time to
+    first token and generation speed.
+    """
+
+    def __init__(self, model_id="stub", first_token_seconds=0.0, seconds_per_section=0.0):
+        self.model_id = model_id
+        self.first_token_seconds = first_token_seconds
+        self.seconds_per_section = seconds_per_section
+        # Runs are stateless; a list keeps AgentPool's memory.clear() working
+        self.memory = []
+
+    def report_sections(self, query, images=None):
+        digest = hashlib.sha256(query.encode())
+        for image in images or []:
+            with open(image, "rb") as f:
+                digest.update(f.read())
+        rng = random.Random(digest.digest())
+        severity = rng.choice(["Normal", "Mild", "Moderate", "Severe"])
+        confidence = rng.randint(50, 95)
+        headers = re.findall(r"^### (.+)$", query, re.MULTILINE) or ["Analysis"]
+        return [
+            f"### {header}\n"
+            f"- Stub finding {rng.randrange(1 << 16):04x} for this section\n"
+            f"- Severity: {severity}, confidence {confidence}%\n\n"
+            for header in headers
+        ]
+
+    def _stream(self, sections):
+        time.sleep(self.first_token_seconds)
+        for section in sections:
+            yield StubResponse(section)
+            time.sleep(self.seconds_per_section)
+
+    def run(self, query, images=None, stream=False, **kwargs):
+        sections = self.report_sections(query, images)
+        if stream:
+            return self._stream(sections)
+        for _ in self._stream(sections):
+            pass
+        return StubResponse("".join(sections))
+
+def build_stub(api_key, model_id, tools):
+    return StubAgent(model_id)
+
+def build_fake(api_key, model_id, tools):
+    """Gemini stand-in with configurable latency and failures (see fake_services)."""
+    from fake_services import FakeGeminiAgent
+
+    return FakeGeminiAgent(model_id, tools)
+
+register_backend("gemini", build_gemini, "gemini-1.5-flash")
+register_backend("ollama", build_ollama, "llava", needs_api_key=False)
+register_backend("stub", build_stub, "stub", needs_api_key=False)
+register_backend("fake", build_fake, "fake", needs_api_key=False)
@@ -0,0 +1,335 @@
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dispatcher import is_rate_limited, status_code
+
+# Worker threads per service, so the web searches a model call makes never
+# queue behind the model calls waiting on them. A call that times out is
+# abandoned, not killed.
+CALL_WORKERS = int(os.environ.get("CALL_WORKERS", 16))
+_executors = {}
+_executors_lock = threading.Lock()
+
+def _executor(service):
+    with _executors_lock:
+        if service not in _executors:
+            _executors[service] = ThreadPoolExecutor(
+                max_workers=CALL_WORKERS, thread_name_prefix=f"{service}-call"
+            )
+        return _executors[service]
+
+class CircuitOpen(Exception):
+    """Raised without calling the service while its circuit breaker is open."""
+
+class CallAbandoned(Exception):
+    """Raised in a worker whose guarded call has already timed out or lost its hedge race."""
+
+# Per worker thread: the Event set once its guarded call has been given up on
+_current = threading.local()
+
+def check_abandoned():
+    """Raise CallAbandoned if the guarded call running on this thread was given up on.
+
+    Call it after waiting for a dispatcher slot and before calling the
+    service, so a late worker doesn't spend quota on a result nobody reads.
+    """
+    abandoned = getattr(_current, "abandoned", None)
+    if abandoned is not None and abandoned.is_set():
+        raise CallAbandoned("The call was abandoned while it waited")
+
+class RetryPolicy:
+    """Timeout, retry and hedging settings for one kind of call.
+
+    ``timeout`` bounds each attempt from when a worker starts it (for
+    streams, the wait for each chunk); the wait for a free worker is bounded
+    by the same amount.
+    Retryable failures are retried up to ``attempts`` times in total with
+    exponential backoff and full jitter. With ``hedge`` on, an attempt still
+    running after the ``hedge_percentile`` of recent latencies gets a
+    duplicate, and the first one to succeed wins.
+    """
+
+    def __init__(self, timeout=120.0, attempts=3, backoff=1.0, max_backoff=30.0,
+                 hedge=False, hedge_percentile=0.95, min_samples=20):
+        self.timeout = timeout
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+
+    def delay(self, attempt):
+        """Sleep before retry number ``attempt`` (1-based)."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+# One full agent run, which includes any tool calls it makes
+ANALYSIS_TIMEOUT_SECONDS = float(os.environ.get("ANALYSIS_TIMEOUT_SECONDS", 180))
+ANALYSIS_POLICY = RetryPolicy(timeout=ANALYSIS_TIMEOUT_SECONDS, attempts=3, backoff=2.0)
+HEDGED_ANALYSIS_POLICY = RetryPolicy(timeout=ANALYSIS_TIMEOUT_SECONDS, attempts=3, backoff=2.0, hedge=True)
+# One web search issued by the agent
+SEARCH_TIMEOUT_SECONDS = float(os.environ.get("SEARCH_TIMEOUT_SECONDS", 10))
+SEARCH_POLICY = RetryPolicy(timeout=SEARCH_TIMEOUT_SECONDS, attempts=3, backoff=0.5, max_backoff=4.0)
+
+# Statuses worth another try; other 4xx are the caller's mistake
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Client-library timeout / outage exceptions, by class name so the libraries stay optional
+RETRYABLE_ERRORS = {
+    "DeadlineExceeded", "ServiceUnavailable", "InternalServerError", "ServerError",
+    "ReadTimeout", "ConnectTimeout", "RemoteDisconnected",
+}
+
+def is_retryable(error):
+    """Timeouts, connection failures, rate limits and 5xx responses."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if is_rate_limited(error):
+        return True
+    if isinstance(getattr(error, "reason", None), (TimeoutError, ConnectionError)):
+        # urllib wraps socket failures in URLError
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+class CircuitBreaker:
+    """Stops calling a failing service for a while.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast with CircuitOpen. After ``reset_seconds`` one trial call
+    is let through; its success closes the circuit, its failure reopens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_seconds=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial_running:
+                raise CircuitOpen(
+                    f"{self.name} is failing repeatedly, retry in {max(remaining, 1):.0f}s"
+                )
+            self._trial_running = True
+
+    def record(self, error=None):
+        with self._lock:
+            self._trial_running = False
+            if error is None:
+                self._failures = 0
+                self._opened_at = None
+            elif is_retryable(error):
+                # Caller mistakes (bad key, bad request) don't say the service is down
+                self._failures += 1
+                if self._opened_at is not None or self._failures >= self.failure_threshold:
+                    self._opened_at = time.monotonic()
+
+# Process-wide breakers, one per external service
+BREAKERS = {
+    "model": CircuitBreaker("The analysis model"),
+    "duckduckgo": CircuitBreaker("Web search", failure_threshold=3, reset_seconds=60.0),
+}
+
+class LatencyTracker:
+    """Recent successful call latencies, for the hedging threshold."""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction, min_samples=1):
+        """Latency at ``fraction`` of recent samples, or None with too few samples."""
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+LATENCIES = {name: LatencyTracker() for name in BREAKERS}
+
+# How often an attempt still waiting for a free worker checks whether one picked it up
+QUEUE_POLL_SECONDS = 0.05
+
+def _submit(executor, func, abandoned):
+    """Submit ``func``; the future's ``started`` list gets its start time once a worker runs it."""
+    started = []
+
+    def run():
+        started.append(time.perf_counter())
+        _current.abandoned = abandoned
+        try:
+            return func()
+        finally:
+            _current.abandoned = None
+
+    future = executor.submit(run)
+    future.started = started
+    return future
+
+def _attempt(func, policy, service):
+    """One attempt, optionally hedged; returns the first successful result.
+
+    The timeout and the hedging delay count from when a worker starts the
+    original call, whatever happens to it afterwards. Calls still queued
+    when the attempt ends are cancelled; running ones can't be stopped, but
+    check_abandoned() lets them bail out before reaching the service, and
+    their results are dropped.
+    """
+    executor = _executor(service)
+    latencies = LATENCIES[service]
+    abandoned = threading.Event()
+    submitted = time.perf_counter()
+    original = _submit(executor, func, abandoned)
+    futures = {original}
+    hedge_after = None
+    if policy.hedge:
+        hedge_after = latencies.percentile(policy.hedge_percentile, policy.min_samples)
+    error = None
+    try:
+        while futures:
+            begun = original.started[0] if original.started else None
+            now = time.perf_counter()
+            remaining = (begun or submitted) + policy.timeout - now
+            if remaining <= 0:
+                break
+            if begun is None:
+                wait_for = min(remaining, QUEUE_POLL_SECONDS)
+            elif hedge_after is not None:
+                wait_for = min(remaining, max(0.0, begun + hedge_after - now))
+            else:
+                wait_for = remaining
+            done, futures = wait(futures, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                latencies.add(time.perf_counter() - future.started[0])
+                return result
+            if (hedge_after is not None and begun is not None and not done
+                    and time.perf_counter() >= begun + hedge_after):
+                # Slower than usual: race a duplicate against the original
+                futures.add(_submit(executor, func, abandoned))
+                hedge_after = None
+        if error is not None and not futures:
+            raise error
+        if not original.started:
+            raise TimeoutError(f"No worker free for {service} within {policy.timeout:.0f}s")
+        raise TimeoutError(f"No response within {policy.timeout:.0f}s")
+    finally:
+        abandoned.set()
+        for future in futures:
+            future.cancel()
+
+def call_with_policy(func, policy, service):
+    """Call ``func()`` with the policy's timeout, retries and hedging.
+
+    ``service`` names the circuit breaker, latency history and worker pool
+    to use. With hedging on, ``func`` may run more than once concurrently,
+    so it must set up its own state (e.g. lease its own agent).
+    """
+    breaker = BREAKERS[service]
+    for attempt in range(1, policy.attempts + 1):
+        breaker.before_call()
+        try:
+            result = _attempt(func, policy, service)
+        except Exception as e:
+            breaker.record(e)
+            if attempt == policy.attempts or not is_retryable(e):
+                raise
+            time.sleep(policy.delay(attempt))
+            continue
+        breaker.record()
+        return result
+
+_DONE = object()
+
+def _pump(make_stream, chunks, stop):
+    """Feed the stream's chunks to ``chunks`` until it ends or ``stop`` is set."""
+    stream = None
+    # Lets the generator call check_abandoned() once it holds a dispatcher slot
+    _current.abandoned = stop
+    try:
+        stream = make_stream()
+        for chunk in stream:
+            if stop.is_set():
+                return
+            chunks.put(chunk)
+        chunks.put(_DONE)
+    except Exception as e:
+        chunks.put(e)
+    finally:
+        # Runs the generator's cleanup (dispatcher slot, agent lease) when abandoned
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+def stream_with_policy(make_stream, policy, service):
+    """Yield from ``make_stream()`` with a per-chunk timeout.
+
+    Failures before the first chunk are retried like call_with_policy;
+    once output has been shown it can't be taken back, so later failures
+    are raised. Streams are never hedged. Each attempt reads the stream on
+    its own thread, which stops and closes the stream at its next chunk
+    once the attempt times out or the caller stops iterating.
+    """
+    breaker = BREAKERS[service]
+    start = time.perf_counter()
+    for attempt in range(1, policy.attempts + 1):
+        breaker.before_call()
+        chunks = queue.Queue()
+        stop = threading.Event()
+        threading.Thread(
+            target=_pump, args=(make_stream, chunks, stop), name=f"{service}-stream", daemon=True
+        ).start()
+        started = False
+        try:
+            while True:
+                try:
+                    chunk = chunks.get(timeout=policy.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No output for {policy.timeout:.0f}s") from None
+                if chunk is _DONE:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                started = True
+                yield chunk
+        except Exception as e:
+            breaker.record(e)
+            if started or attempt == policy.attempts or not is_retryable(e):
+                raise
+            time.sleep(policy.delay(attempt))
+            continue
+        finally:
+            stop.set()
+        breaker.record()
+        LATENCIES[service].add(time.perf_counter() - start)
+        return
@@ -0,0 +1,142 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Similar findings produce the same searches; results stay useful for hours
+SEARCH_TTL_SECONDS = 6 * 3600
+SEARCH_CACHE_ENTRIES = 2048
+# Parallel searches across all sessions
+SEARCH_WORKERS = 8
+
+_search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+
+def normalize_query(query):
+    """Cache key for a query: case, whitespace and punctuation ignored.
+
+    Word order and repeats are kept, since reordered words can ask a
+    different question ("pneumonia after surgery" / "surgery after pneumonia").
+    """
+    return " ".join(re.findall(r"\w+", query.casefold()))
+
+class SearchCache:
+    """Thread-safe LRU of search results whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries=SEARCH_CACHE_ENTRIES, ttl=SEARCH_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, results):
+        with self._lock:
+            self._entries[key] = (results, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class SearchMetrics:
+    """Latency of recent queries, split by cache hits and live searches."""
+
+    def __init__(self, size=500):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, query, seconds, cached, results):
+        with self._lock:
+            self._samples.append((query, seconds, cached, results))
+
+    def recent(self):
+        with self._lock:
+            return list(self._samples)
+
+    def stats(self):
+        """Query counts and p50/p95 latency of live (uncached) searches, for display."""
+        samples = self.recent()
+        live = sorted(seconds for _, seconds, cached, _ in samples if not cached)
+
+        def at(fraction):
+            return live[min(len(live) - 1, int(fraction * len(live)))] if live else 0.0
+
+        return {
+            "queries": len(samples),
+            "cached": len(samples) - len(live),
+            "p50": at(0.5),
+            "p95": at(0.95),
+        }
+
+# Shared by every agent in the process
+SEARCH_CACHE = SearchCache()
+SEARCH_METRICS = SearchMetrics()
+
+def cached_search(source, query, max_results, fetch):
+    """Results of ``fetch(query, max_results)`` (a list of dicts), cached per normalized query.
+
+    ``source`` separates caches of different search backends or kinds
+    (web vs news).
+    """
+    start = time.perf_counter()
+    key = (source, normalize_query(query), max_results)
+    results = SEARCH_CACHE.get(key)
+    cached = results is not None
+    if not cached:
+        results = fetch(query, max_results)
+        SEARCH_CACHE.put(key, results)
+    SEARCH_METRICS.record(query, time.perf_counter() - start, cached, len(results))
+    return results
+
+def result_key(result):
+    """Identity of a result for de-duplication: URL without scheme, www or trailing slash."""
+    url = result.get("href") or result.get("url") or ""
+    url = re.sub(r"^https?://(www\.)?", "", url.strip().lower()).rstrip("/")
+    return url or result.get("title", "").strip().lower()
+
+def search_many(source, queries, max_results, fetch):
+    """Run distinct queries in parallel and merge their results without duplicates.
+
+    A failing query is reported in place of its results instead of failing
+    the whole batch.
+    """
+    unique = list(OrderedDict((normalize_query(query), query) for query in queries).values())
+    futures = [
+        _search_executor.submit(cached_search, source, query, max_results, fetch)
+        for query in unique
+    ]
+    merged, seen, errors = [], set(), []
+    for query, future in zip(unique, futures):
+        try:
+            results = future.result()
+        except Exception as e:
+            errors.append({"query": query, "error": str(e)})
+            continue
+        for result in results:
+            key = result_key(result)
+            if key not in seen:
+                seen.add(key)
+                merged.append(dict(result, query=query))
+    return merged, errors
+
+def json_fetch(search):
+    """Adapt a tool function returning JSON text to ``fetch`` returning a list."""
+    return lambda query, max_results: json.loads(search(query, max_results))
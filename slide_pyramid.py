@@ -0,0 +1,112 @@
+import math
+from PIL import ImageDraw
+from image_previews import ANALYSIS_MAX_SIDE, downscale, side_fit
+from tiff_pages import sampling_step, to_image
+
+# Largest region side read at native resolution for the agent; larger
+# regions are read from a coarser level. The analysis image is never
+# bigger than this anyway.
+ROI_MAX_SIDE = ANALYSIS_MAX_SIDE
+# Region sides offered in the app
+ROI_SIDES = (256, 512, 1024, 2048)
+# Relative size mismatch tolerated between a level's width and height
+# ratios (levels are rounded down to whole pixels)
+ASPECT_TOLERANCE = 0.02
+
+def pyramid_levels(pages):
+    """Pages forming the resolution pyramid of a slide, finest first.
+
+    SVS files also hold a thumbnail (kept, it is just a small level) and
+    label and macro photos, which are skipped by name and aspect ratio.
+    """
+    candidates = [
+        page for page in pages
+        if not any(word in page.description.lower() for word in ("label", "macro"))
+    ]
+    if not candidates:
+        return []
+    base = max(candidates, key=lambda page: page.width * page.height)
+    levels = {}
+    for page in candidates:
+        width_ratio, height_ratio = page.width / base.width, page.height / base.height
+        rounding = 2 / min(page.width, page.height)
+        if abs(width_ratio - height_ratio) <= ASPECT_TOLERANCE * width_ratio + rounding:
+            levels.setdefault(page.width, page)
+    return sorted(levels.values(), key=lambda page: -page.width)
+
+def is_pyramid(tiff):
+    """Whether a TIFF is a tiled, multi-resolution whole-slide image."""
+    levels = pyramid_levels(tiff.pages)
+    return len(levels) > 1 and levels[0].tiled
+
+class SlidePyramid:
+    """Level-of-detail reads from a pyramidal whole-slide TIFF (SVS-style or BigTIFF).
+
+    Regions are given in full-resolution (level 0) coordinates, as in
+    OpenSlide. Each read picks the coarsest level that still has enough
+    pixels for the requested output size and streams only the tiles it
+    covers through the TIFF's chunk cache, so memory is bounded by the
+    output size and the cache, not by the slide.
+    """
+
+    def __init__(self, tiff):
+        self.tiff = tiff
+        self.levels = pyramid_levels(tiff.pages)
+        base = self.levels[0]
+        self.width, self.height = base.width, base.height
+        self.downsamples = [
+            (base.width / level.width, base.height / level.height) for level in self.levels
+        ]
+
+    def label(self):
+        factors = ", ".join(f"{math.sqrt(x * y):.0f}×" for x, y in self.downsamples)
+        return f"Slide {self.width}×{self.height}, {len(self.levels)} levels ({factors})"
+
+    def best_level(self, downsample):
+        """Index of the coarsest level whose downsample doesn't exceed ``downsample``."""
+        best = 0
+        for index, (x, y) in enumerate(self.downsamples):
+            if math.sqrt(x * y) <= downsample * (1 + ASPECT_TOLERANCE):
+                best = index
+        return best
+
+    def read_region(self, left, top, width, height, max_side=None):
+        """PIL image of a level-0 region, reduced to fit ``max_side`` (native resolution without it)."""
+        left, top = max(left, 0), max(top, 0)
+        width, height = min(width, self.width - left), min(height, self.height - top)
+        level = 0
+        if max_side:
+            level = self.best_level(max(width, height) / max_side)
+        x_factor, y_factor = self.downsamples[level]
+        page = self.levels[level]
+        level_width = max(1, round(width / x_factor))
+        level_height = max(1, round(height / y_factor))
+        step = sampling_step(level_width, level_height, max_side) if max_side else 1
+        pixels = self.tiff.read_region(
+            page.index, int(left / x_factor), int(top / y_factor), level_width, level_height, step
+        )
+        image = to_image(pixels, page)
+        if max_side:
+            image = downscale(image, side_fit(image.size, max_side))
+        return image
+
+    def overview(self, max_side=ANALYSIS_MAX_SIDE):
+        """Whole slide at preview size, read from the nearest level."""
+        return self.read_region(0, 0, self.width, self.height, max_side)
+
+    def roi(self, center_x, center_y, side):
+        """Square region around a level-0 point, at native resolution up to ``ROI_MAX_SIDE``."""
+        side = min(side, self.width, self.height)
+        left = min(max(center_x - side // 2, 0), self.width - side)
+        top = min(max(center_y - side // 2, 0), self.height - side)
+        max_side = ROI_MAX_SIDE if side > ROI_MAX_SIDE else None
+        return (left, top, side, side), self.read_region(left, top, side, side, max_side)
+
+def mark_region(preview, slide, region):
+    """Copy of an overview thumbnail with a level-0 region outlined."""
+    scale = preview.width / slide.width
+    left, top, width, height = region
+    marked = preview.convert("RGB")
+    box = [left * scale, top * scale, (left + width) * scale, (top + height) * scale]
+    ImageDraw.Draw(marked).rectangle(box, outline=(255, 64, 64), width=2)
+    return marked
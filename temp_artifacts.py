@@ -0,0 +1,57 @@
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+# All artifacts live under one directory so the sweeper never touches foreign files
+ARTIFACT_DIR_NAME = "medical-imaging-agent"
+ARTIFACT_PREFIX = "artifact-"
+
+def temp_root():
+    """Return the artifact directory, preferring tmpfs (/dev/shm) when available."""
+    candidates = ["/dev/shm", tempfile.gettempdir()]
+    for base in candidates:
+        if os.path.isdir(base) and os.access(base, os.W_OK):
+            root = os.path.join(base, ARTIFACT_DIR_NAME)
+            try:
+                os.makedirs(root, exist_ok=True)
+                return root
+            except OSError:
+                continue
+    raise Exception("No writable temporary directory available")
+
+def new_session_id():
+    """Return a random identifier used to namespace one session's artifacts."""
+    return uuid.uuid4().hex
+
+@contextmanager
+def temp_artifact(suffix, session_id=None):
+    """Yield a unique temp file path and remove the file on exit."""
+    prefix = f"{ARTIFACT_PREFIX}{session_id or 'anon'}-"
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=temp_root())
+    os.close(fd)
+    try:
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def sweep_stale_artifacts(max_age_seconds=3600):
+    """Remove artifacts left behind by crashed sessions; returns the count removed."""
+    root = temp_root()
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for entry in os.scandir(root):
+        if not entry.name.startswith(ARTIFACT_PREFIX) or not entry.is_file():
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Another process cleaned it up first
+            pass
+    return removed
@@ -0,0 +1,375 @@
+import io
+import math
+import mmap
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+from dicom_pixels import normalize_pixels
+from upload_limits import MAX_FRAMES, MAX_IMAGE_PIXELS, budget_side, check_frames, check_pixels
+
+# Baseline and extension tags read from each image file directory (IFD)
+NEW_SUBFILE_TYPE = 254
+IMAGE_WIDTH = 256
+IMAGE_LENGTH = 257
+BITS_PER_SAMPLE = 258
+COMPRESSION = 259
+PHOTOMETRIC = 262
+IMAGE_DESCRIPTION = 270
+STRIP_OFFSETS = 273
+SAMPLES_PER_PIXEL = 277
+ROWS_PER_STRIP = 278
+STRIP_BYTE_COUNTS = 279
+PLANAR_CONFIGURATION = 284
+PREDICTOR = 317
+TILE_WIDTH = 322
+TILE_LENGTH = 323
+TILE_OFFSETS = 324
+TILE_BYTE_COUNTS = 325
+SAMPLE_FORMAT = 339
+JPEG_TABLES = 347
+
+# Field type -> (struct format character, size in bytes)
+FIELD_TYPES = {
+    1: ("B", 1), 2: ("s", 1), 3: ("H", 2), 4: ("I", 4), 6: ("b", 1), 7: ("B", 1),
+    8: ("h", 2), 9: ("i", 4), 11: ("f", 4), 12: ("d", 8), 16: ("Q", 8), 17: ("q", 8), 18: ("Q", 8),
+}
+
+COMPRESSION_NAMES = {
+    1: "uncompressed", 5: "LZW", 6: "old JPEG", 7: "JPEG", 8: "Deflate", 32773: "PackBits",
+    32946: "Deflate", 33003: "JPEG 2000", 33005: "JPEG 2000", 34712: "JPEG 2000",
+}
+
+# Photometric interpretations
+WHITE_IS_ZERO = 0
+
+def sampling_step(width, height, max_side):
+    """Largest power-of-two step that keeps the longest side at or above ``max_side``."""
+    ratio = max(width, height) / max_side
+    return 1 << int(math.log2(ratio)) if ratio >= 2 else 1
+
+class UnsupportedTiff(Exception):
+    """The page uses a layout or codec the lazy reader can't decode piecewise."""
+
+# Codecs decoded by Pillow's C decoders, by compression tag
+NATIVE_CODECS = {5: "tiff_lzw", 32773: "packbits"}
+
+def decode_native(data, codec, row_size, rows):
+    """Decode ``rows`` rows of ``row_size`` bytes with one of Pillow's C decoders.
+
+    The bytes are decoded into an 8-bit image ``row_size`` wide, so any
+    sample type comes out as its raw bytes, and output stops at the
+    chunk's declared size however far the data would expand.
+    """
+    image = Image.frombytes("L", (row_size, rows), bytes(data), codec, "L")
+    return np.asarray(image).reshape(-1)
+
+class TiffPage:
+    """Layout of one page (IFD): size, pixel format and where its tiles or strips are."""
+
+    def __init__(self, index, tags, byte_order):
+        self.index = index
+        self.width = int(tags[IMAGE_WIDTH][0])
+        self.height = int(tags[IMAGE_LENGTH][0])
+        self.samples = int(tags.get(SAMPLES_PER_PIXEL, [1])[0])
+        self.bits = int(tags.get(BITS_PER_SAMPLE, [1])[0])
+        self.sample_format = int(tags.get(SAMPLE_FORMAT, [1])[0])
+        self.compression = int(tags.get(COMPRESSION, [1])[0])
+        self.photometric = int(tags.get(PHOTOMETRIC, [1])[0])
+        self.planar = int(tags.get(PLANAR_CONFIGURATION, [1])[0])
+        self.predictor = int(tags.get(PREDICTOR, [1])[0])
+        self.subfile_type = int(tags.get(NEW_SUBFILE_TYPE, [0])[0])
+        self.description = tags.get(IMAGE_DESCRIPTION, b"").rstrip(b"\0").decode("latin-1")
+        self.jpeg_tables = tags.get(JPEG_TABLES)
+        self.byte_order = byte_order
+        self.tiled = TILE_OFFSETS in tags
+        if self.tiled:
+            self.chunk_width = int(tags[TILE_WIDTH][0])
+            self.chunk_height = int(tags[TILE_LENGTH][0])
+            self.offsets, self.byte_counts = tags[TILE_OFFSETS], tags[TILE_BYTE_COUNTS]
+        else:
+            self.chunk_width = self.width
+            self.chunk_height = min(int(tags.get(ROWS_PER_STRIP, [self.height])[0]), self.height)
+            self.offsets, self.byte_counts = tags[STRIP_OFFSETS], tags[STRIP_BYTE_COUNTS]
+        self.columns = math.ceil(self.width / self.chunk_width)
+        self.rows = math.ceil(self.height / self.chunk_height)
+
+    @property
+    def dtype(self):
+        kind = {1: "u", 2: "i", 3: "f"}.get(self.sample_format)
+        if kind is None or self.bits not in (8, 16, 32, 64):
+            return None
+        return np.dtype(f"{self.byte_order}{kind}{self.bits // 8}")
+
+    @property
+    def nbytes(self):
+        """Decoded size of the whole page."""
+        return self.width * self.height * self.samples * max(self.bits // 8, 1)
+
+    def label(self):
+        layout = f"{self.chunk_width}×{self.chunk_height} tiles" if self.tiled else "strips"
+        compression = COMPRESSION_NAMES.get(self.compression, f"compression {self.compression}")
+        return f"{self.width}×{self.height}, {layout}, {compression}"
+
+    def check_supported(self):
+        """Raise UnsupportedTiff unless chunks of this page can be decoded on their own."""
+        if self.dtype is None:
+            raise UnsupportedTiff(f"{self.bits}-bit samples")
+        if self.planar != 1 and self.samples > 1:
+            raise UnsupportedTiff("separate colour planes")
+        if self.predictor not in (1, 2):
+            raise UnsupportedTiff(f"predictor {self.predictor}")
+        codec = NATIVE_CODECS.get(self.compression)
+        if codec is not None:
+            supported = hasattr(Image.core, f"{codec}_decoder")
+        else:
+            supported = self.compression in (1, 7, 8, 32946)
+        if not supported:
+            raise UnsupportedTiff(COMPRESSION_NAMES.get(self.compression, str(self.compression)))
+        if self.photometric not in (0, 1, 2) and not (self.photometric == 6 and self.compression == 7):
+            raise UnsupportedTiff(f"photometric interpretation {self.photometric}")
+        if self.chunk_width * self.chunk_height > MAX_IMAGE_PIXELS:
+            raise UnsupportedTiff(f"{self.chunk_width}×{self.chunk_height} strips or tiles")
+
+def parse_tiff(data, max_pages=MAX_FRAMES):
+    """Pages of a classic or BigTIFF file, reading only the directories."""
+    byte_order = {b"II": "<", b"MM": ">"}.get(bytes(data[:2]))
+    if byte_order is None:
+        raise ValueError("Not a TIFF file")
+    version = struct.unpack(byte_order + "H", data[2:4])[0]
+    if version == 42:
+        offset_format, count_format, entry_size, inline_size = "I", "H", 12, 4
+        offset = struct.unpack(byte_order + "I", data[4:8])[0]
+    elif version == 43:
+        offset_format, count_format, entry_size, inline_size = "Q", "Q", 20, 8
+        offset = struct.unpack(byte_order + "Q", data[8:16])[0]
+    else:
+        raise ValueError(f"Unknown TIFF version {version}")
+    count_size = struct.calcsize(count_format)
+    offset_size = struct.calcsize(offset_format)
+
+    pages = []
+    seen = set()
+    while offset and offset not in seen:
+        # Each directory is cheap, but a crafted chain can hold millions
+        check_frames(len(pages) + 1, max_pages)
+        seen.add(offset)
+        entries = struct.unpack(byte_order + count_format, data[offset:offset + count_size])[0]
+        tags = {}
+        for position in range(offset + count_size, offset + count_size + entries * entry_size, entry_size):
+            tag, field_type = struct.unpack(byte_order + "HH", data[position:position + 4])
+            count = struct.unpack(
+                byte_order + offset_format, data[position + 4:position + 4 + offset_size]
+            )[0]
+            if field_type not in FIELD_TYPES:
+                continue
+            code, size = FIELD_TYPES[field_type]
+            value_at = position + 4 + offset_size
+            if count * size > inline_size:
+                value_at = struct.unpack(byte_order + offset_format, data[value_at:value_at + offset_size])[0]
+            raw = data[value_at:value_at + count * size]
+            if len(raw) < count * size:
+                raise ValueError(f"Truncated TIFF tag {tag}")
+            if field_type in (2, 7):
+                tags[tag] = bytes(raw)
+            else:
+                # Tile tables can have 100k+ entries, so decode them as arrays
+                tags[tag] = np.frombuffer(raw, dtype=np.dtype(byte_order + code)).astype(np.int64)
+        offset_at = offset + count_size + entries * entry_size
+        pages.append(TiffPage(len(pages), tags, byte_order))
+        offset = struct.unpack(byte_order + offset_format, data[offset_at:offset_at + offset_size])[0]
+    return pages
+
+class TiffPages:
+    """Lazy page, tile and region access to a (multi-page, tiled or striped) TIFF.
+
+    Only the directories are parsed up front. Pixels are decoded one tile or
+    strip at a time when a region needs them, and at most ``cache_size``
+    decoded chunks are kept, so memory follows the region viewed rather than
+    the file size. ``data`` is anything sliceable: bytes, a memoryview of an
+    upload, or an mmap of a file on disk.
+    """
+
+    def __init__(self, data, cache_size=64, path=None):
+        self.data = data
+        self.path = path
+        self.pages = parse_tiff(data)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # Instances are shared between sessions through the decoded-upload cache
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path, **kwargs):
+        """Map a file on disk; pages are read from the page cache, not loaded."""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), path=path, **kwargs)
+
+    def __len__(self):
+        return len(self.pages)
+
+    @property
+    def nbytes(self):
+        """Encoded file plus the decoded chunks currently cached."""
+        return len(self.data) + sum(chunk.nbytes for chunk in list(self._cache.values()))
+
+    @property
+    def max_nbytes(self):
+        """Most this can hold: the encoded file plus a full cache of the largest chunks."""
+        largest = max(
+            (page.chunk_width * page.chunk_height * page.samples * max(page.bits // 8, 1)
+             for page in self.pages),
+            default=0,
+        )
+        return len(self.data) + self.cache_size * largest
+
+    def chunk(self, page, index, scale=1):
+        """Decoded pixels (rows, columns, samples) of one tile or strip."""
+        key = (page.index, index, scale)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        chunk = self._decode_chunk(page, index, scale)
+        with self._lock:
+            self._cache[key] = chunk
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return chunk
+
+    def _decode_chunk(self, page, index, scale):
+        page.check_supported()
+        start = int(page.offsets[index])
+        raw = self.data[start:start + int(page.byte_counts[index])]
+        height = page.chunk_height
+        if not page.tiled:
+            # The last strip only holds the remaining rows
+            height = min(height, page.height - (index // page.columns) * page.chunk_height)
+
+        if page.compression == 7:
+            return self._decode_jpeg(page, bytes(raw), scale)
+        row_size = page.chunk_width * page.samples * page.dtype.itemsize
+        # Never inflate past what the chunk's declared size can hold
+        expected = height * row_size
+        if page.compression in (8, 32946):
+            raw = zlib.decompressobj().decompress(raw, expected)
+        elif page.compression in NATIVE_CODECS:
+            raw = decode_native(raw, NATIVE_CODECS[page.compression], row_size, height)
+        height = min(height, len(raw) // row_size)
+        chunk = np.frombuffer(raw, dtype=page.dtype, count=height * row_size // page.dtype.itemsize)
+        # Big-endian files: work in native order so LUT-based normalization is valid
+        chunk = chunk.astype(chunk.dtype.newbyteorder("="), copy=False)
+        chunk = chunk.reshape(height, page.chunk_width, page.samples)
+        if page.predictor == 2:
+            # Horizontal differencing; unsigned sums wrap exactly like the encoder
+            chunk = np.cumsum(chunk, axis=1, dtype=chunk.dtype)
+        if scale > 1:
+            # Copy so the cache doesn't keep the full-size chunk alive
+            chunk = np.ascontiguousarray(chunk[::scale, ::scale])
+        return chunk
+
+    def _decode_jpeg(self, page, data, scale):
+        """Decode one JPEG tile, at 1/2-1/8 size in the DCT domain when ``scale`` allows."""
+        if page.jpeg_tables:
+            # Tiles omit the shared quantization/Huffman tables; splice them back in
+            data = page.jpeg_tables[:-2] + data[2:]
+        image = Image.open(io.BytesIO(data))
+        size = (max(1, page.chunk_width // scale), max(1, page.chunk_height // scale))
+        # The stream's own markers say whether it holds RGB or YCbCr, as for any JPEG
+        image.draft(image.mode, size)
+        chunk = np.asarray(image)
+        if chunk.ndim == 2:
+            chunk = chunk[:, :, None]
+        # draft() picks the nearest DCT scale at or above the target; finish by striding
+        decoded_scale = max(1, page.chunk_width // chunk.shape[1])
+        if decoded_scale < scale:
+            step = scale // decoded_scale
+            chunk = chunk[::step, ::step]
+        return chunk
+
+    def read_region(self, index, left, top, width, height, scale=1):
+        """Pixels (height, width, samples) of a page region, decoding only the chunks it covers.
+
+        With ``scale`` > 1 every ``scale``-th pixel of the region is returned
+        (JPEG chunks are reduced while decoding), for previews of large pages.
+        """
+        page = self.pages[index]
+        right, bottom = min(left + width, page.width), min(top + height, page.height)
+        left, top = max(left, 0), max(top, 0)
+        out = np.zeros(
+            (math.ceil((bottom - top) / scale), math.ceil((right - left) / scale), page.samples),
+            dtype=page.dtype.newbyteorder("="),
+        )
+        for row in range(top // page.chunk_height, math.ceil(bottom / page.chunk_height)):
+            for column in range(left // page.chunk_width, math.ceil(right / page.chunk_width)):
+                chunk_left, chunk_top = column * page.chunk_width, row * page.chunk_height
+                # Overlap in page coordinates, snapped to the sampling grid
+                x0 = max(left, chunk_left)
+                y0 = max(top, chunk_top)
+                x0 += -(x0 - left) % scale
+                y0 += -(y0 - top) % scale
+                if (x0 >= min(right, chunk_left + page.chunk_width)
+                        or y0 >= min(bottom, chunk_top + page.chunk_height)):
+                    # No sampled pixel falls in this chunk: strips thinner than the step
+                    continue
+                chunk = self.chunk(page, row * page.columns + column, scale)
+                # Decoded chunks can be short (the last strip, truncated data)
+                x1 = min(right, chunk_left + chunk.shape[1] * scale)
+                y1 = min(bottom, chunk_top + chunk.shape[0] * scale)
+                if x0 >= x1 or y0 >= y1:
+                    continue
+                # Chunks are sampled from their own origin, so re-index when the grids differ
+                piece = chunk[(y0 - chunk_top) // scale:, (x0 - chunk_left) // scale:]
+                out_x, out_y = (x0 - left) // scale, (y0 - top) // scale
+                rows = min(piece.shape[0], out.shape[0] - out_y, math.ceil((y1 - y0) / scale))
+                columns = min(piece.shape[1], out.shape[1] - out_x, math.ceil((x1 - x0) / scale))
+                out[out_y:out_y + rows, out_x:out_x + columns] = piece[:rows, :columns]
+        return out
+
+    def render(self, index=0, region=None, max_side=None):
+        """Display-ready PIL image of a page or of a ``(left, top, width, height)`` region.
+
+        With ``max_side`` the region is sampled down while reading, so a
+        preview of a huge page only ever holds the preview-sized pixels.
+        Without it, regions over the pixel budget are sampled down to fit.
+        Pages the lazy reader can't split are decoded whole with Pillow.
+        """
+        page = self.pages[index]
+        left, top, width, height = region or (0, 0, page.width, page.height)
+        try:
+            page.check_supported()
+        except UnsupportedTiff:
+            return self._render_with_pillow(index, (left, top, left + width, top + height))
+        budget = budget_side(width, height)
+        scale = 1
+        if max_side:
+            scale = sampling_step(width, height, max_side)
+        elif budget:
+            # Smallest power-of-two step that brings the region within the budget
+            scale = 1 << math.ceil(math.log2(max(width, height) / budget))
+        return to_image(self.read_region(index, left, top, width, height, scale), page)
+
+    def _render_with_pillow(self, index, box):
+        # Pillow decodes the whole page, whatever the region
+        check_pixels(self.pages[index].width, self.pages[index].height)
+        image = Image.open(self.path or io.BytesIO(self.data))
+        image.seek(index)
+        image = image.crop(box)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        return image
+
+def to_image(pixels, page):
+    """uint8 L or RGB image from decoded samples, min-max normalizing deeper data."""
+    if pixels.shape[2] in (2, 4):
+        # Drop alpha / extra samples
+        pixels = pixels[:, :, :1] if pixels.shape[2] == 2 else pixels[:, :, :3]
+    if pixels.dtype != np.uint8:
+        pixels = normalize_pixels(pixels)
+    if page.photometric == WHITE_IS_ZERO:
+        pixels = 255 - pixels
+    if pixels.shape[2] == 1:
+        return Image.fromarray(np.ascontiguousarray(pixels[:, :, 0]), mode="L")
+    return Image.fromarray(np.ascontiguousarray(pixels), mode="RGB")
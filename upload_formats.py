@@ -0,0 +1,67 @@
+import struct
+
+# Bytes read to identify any registered format; DICOM's magic sits at offset 128
+SNIFF_BYTES = 132
+
+# Value representations that follow the tag of an explicit-VR DICOM element
+DICOM_VRS = {
+    b"AE", b"AS", b"AT", b"CS", b"DA", b"DS", b"DT", b"FD", b"FL", b"IS", b"LO", b"LT", b"OB",
+    b"OD", b"OF", b"OL", b"OV", b"OW", b"PN", b"SH", b"SL", b"SQ", b"SS", b"ST", b"SV", b"TM",
+    b"UC", b"UI", b"UL", b"UN", b"UR", b"US", b"UT", b"UV",
+}
+
+# Formats by name: detect(head) -> bool on the first SNIFF_BYTES bytes,
+# checked in registration order
+FORMATS = {}
+
+def register_format(name, detect, first=False):
+    """Register a format detector, ahead of the others with ``first``."""
+    FORMATS.pop(name, None)
+    if first:
+        others = list(FORMATS.items())
+        FORMATS.clear()
+        FORMATS[name] = detect
+        FORMATS.update(others)
+    else:
+        FORMATS[name] = detect
+
+def is_raw_dicom(head):
+    """DICOM stream without the preamble and "DICM" prefix, as older PACS exports write.
+
+    It starts straight with a group 0002 or 0008 element, followed by
+    either a VR (explicit VR) or a short 32-bit length (implicit VR).
+    """
+    if len(head) < 8:
+        return False
+    group, element = struct.unpack("<HH", head[:4])
+    if group not in (0x0002, 0x0008) or element > 0x0100:
+        return False
+    if head[4:6] in DICOM_VRS:
+        return True
+    length = struct.unpack("<I", head[4:8])[0]
+    return length <= 256 and length % 2 == 0
+
+def is_dicom(head):
+    return head[128:132] == b"DICM" or is_raw_dicom(head)
+
+register_format("dicom", is_dicom)
+register_format("tiff", lambda head: head[:4] in (b"II*\0", b"MM\0*", b"II+\0", b"MM\0+"))
+register_format("png", lambda head: head.startswith(b"\x89PNG\r\n\x1a\n"))
+register_format("jpeg", lambda head: head.startswith(b"\xff\xd8\xff"))
+register_format("zip", lambda head: head.startswith(b"PK\x03\x04"))
+
+def sniff(head):
+    """Name of the format the leading bytes belong to, or None."""
+    head = bytes(head[:SNIFF_BYTES])
+    for name, detect in FORMATS.items():
+        if detect(head):
+            return name
+    return None
+
+def sniff_upload(uploaded_file):
+    """Format of an upload from its first bytes (zero-copy), without decoding anything."""
+    return sniff(uploaded_file.getbuffer()[:SNIFF_BYTES])
+
+def sniff_path(path):
+    with open(path, "rb") as f:
+        return sniff(f.read(SNIFF_BYTES))
@@ -0,0 +1,81 @@
+import math
+import os
+import warnings
+from PIL import Image
+
+# Budgets for one upload, checked from headers before any pixels are decoded
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 1 << 30))
+# Pixels of one image, page, tile or frame decoded at full resolution
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 100_000_000))
+# Everything an upload expands to once decoded (all frames, or a stacked series)
+MAX_DECODED_BYTES = int(os.environ.get("MAX_DECODED_BYTES", 1 << 30))
+# DICOM frames, TIFF pages or series slices
+MAX_FRAMES = int(os.environ.get("MAX_FRAMES", 4096))
+
+class UploadRejected(Exception):
+    """An upload exceeds a budget; raised before its pixels are decoded."""
+
+def megabytes(size):
+    return f"{size / 1e6:.0f} MB"
+
+def check_upload_bytes(size, max_bytes=MAX_UPLOAD_BYTES):
+    """Reject encoded input (an upload, or what an archive expands to) above the byte budget."""
+    if size > max_bytes:
+        raise UploadRejected(f"Upload too large ({megabytes(size)}, limit {megabytes(max_bytes)})")
+
+def check_frames(count, max_frames=MAX_FRAMES):
+    if count > max_frames:
+        raise UploadRejected(f"Too many frames or pages ({count}, limit {max_frames})")
+
+def check_pixels(width, height, max_pixels=MAX_IMAGE_PIXELS):
+    if width * height > max_pixels:
+        raise UploadRejected(
+            f"Image too large to decode ({width}×{height}, limit {max_pixels / 1e6:.0f} megapixels)"
+        )
+
+def check_decoded_bytes(size, max_bytes=MAX_DECODED_BYTES):
+    if size > max_bytes:
+        raise UploadRejected(
+            f"Image too large to decode ({megabytes(size)} decoded, limit {megabytes(max_bytes)})"
+        )
+
+def budget_side(width, height, max_pixels=MAX_IMAGE_PIXELS):
+    """Longest side that brings ``width`` × ``height`` within ``max_pixels``; None if it fits."""
+    if width * height <= max_pixels:
+        return None
+    return max(1, int(max(width, height) * math.sqrt(max_pixels / (width * height))))
+
+def open_image(fileobj, max_pixels=MAX_IMAGE_PIXELS, max_bytes=MAX_DECODED_BYTES, size_for=None):
+    """Open a PNG/JPEG/... with Pillow, enforcing the budgets from its header.
+
+    ``Image.open`` only reads the header, so the size is known before
+    anything is allocated. JPEGs are switched to a reduced DCT-domain
+    decode (1/2, 1/4 or 1/8): the largest reduction that still covers
+    ``size_for(size)``, the smallest size the caller needs, and that fits
+    the pixel budget. Other formats over budget are rejected.
+    """
+    try:
+        with warnings.catch_warnings():
+            # Pillow's own limit is enforced below, with ours
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            image = Image.open(fileobj)
+    except Image.DecompressionBombError as e:
+        raise UploadRejected(f"Image too large to decode ({e})")
+    if image.format == "JPEG":
+        width, height = image.size
+        request = size_for(image.size) if size_for else image.size
+        if width * height > max_pixels:
+            # First reduction within the budget
+            factor = next(
+                (f for f in (2, 4, 8)
+                 if math.ceil(width / f) * math.ceil(height / f) <= max_pixels),
+                8,
+            )
+            request = (min(request[0], width // factor), min(request[1], height // factor))
+        if request[0] < width and request[1] < height:
+            # draft() picks the largest reduction whose result is at least
+            # the requested size, so this never drops below either target
+            image.draft(image.mode, request)
+    check_pixels(*image.size, max_pixels)
+    check_decoded_bytes(image.width * image.height * len(image.getbands()), max_bytes)
+    return image